@@ -25,5 +25,10 @@ if sys.argv[1] == 'trading':
 
     cli.add_command(trading)
 
+if sys.argv[1] == 'preprocess':
+    from preprocessing.cli import preprocess
+
+    cli.add_command(preprocess)
+
 if __name__ == '__main__':
     cli()
@@ -0,0 +1,29 @@
+import os
+
+import click
+
+from preprocessing.pipeline import run
+from utils.datasets import DATASET_DIR
+
+
+@click.group()
+def preprocess():
+    pass
+
+
+@preprocess.command()
+@click.option('--input', 'input_dir', default=os.path.join(DATASET_DIR, 'bitcoin_twitter_test_raw'),
+              help='Directory with the raw part_*.parquet chunks, shard subdirectories included')
+@click.option('--output', 'output_dir', default=os.path.join(DATASET_DIR, 'bitcoin_twitter_test_processed'),
+              help='Directory the cleaned chunks are written to')
+@click.option('--workers', type=int, default=None, help='Number of worker processes, defaults to the number of cores')
+@click.option('--offset', type=int, default=0, help='Number of chunks to skip')
+@click.option('--force', is_flag=True, default=False, help='Process chunks again even if their input is unchanged')
+@click.option('--verbose', is_flag=True, default=False, help='Print the vocabulary coverage after every step')
+@click.option('--profile', is_flag=True, default=False,
+              help='Write per step timings and statistics of every chunk to <output>/profile')
+def twitter(input_dir, output_dir, workers, offset, force, verbose, profile):
+    """
+    Cleans the raw tweet chunks for the sentiment model.
+    """
+    run(input_dir, output_dir, workers=workers, offset=offset, force=force, verbose=verbose, profile=profile)
@@ -0,0 +1,99 @@
+import hashlib
+import inspect
+import os
+import sqlite3
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+from utils.datasets import batched
+
+
+class MemoStore:
+    """
+    Persistent memo of word level cleaning decisions (token -> rewritten token or None if unchanged) shared across
+    chunks and runs. Entries are keyed by step and a version, which covers the step source and whatever else the
+    caller passes (usually the helper files it depends on), so stale decisions are never reused.
+    A bounded LRU keeps the most recent decisions in memory, misses go to sqlite and only tokens which were never
+    seen by the step are computed.
+    """
+
+    def __init__(self, path, capacity=500000):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Several workers may share the store, wait for their writes instead of failing
+        self.db = sqlite3.connect(path, timeout=60)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS memo ('
+            'step TEXT NOT NULL, version TEXT NOT NULL, token TEXT NOT NULL, value TEXT, '
+            'PRIMARY KEY (step, version, token))'
+        )
+        self.db.commit()
+        self.capacity = capacity
+        self.cache = OrderedDict()
+        self.versions = {}
+        self.stats = {'hits': 0, 'stored': 0, 'computed': 0}
+
+    def version(self, fn: Callable, version='') -> str:
+        key = (fn, version)
+        if key not in self.versions:
+            try:
+                source = inspect.getsource(fn)
+            except OSError:
+                # Interactively defined, fall back to the bytecode
+                source = repr((fn.__code__.co_code, fn.__code__.co_consts))
+            self.versions[key] = hashlib.sha1(f'{source}\0{version}'.encode('utf-8')).hexdigest()
+        return self.versions[key]
+
+    def _remember(self, key, value):
+        self.cache[key] = value
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.capacity:
+            self.cache.popitem(last=False)
+
+    def _load(self, step, version, tokens):
+        found = {}
+        for batch in batched(tokens, 500):
+            rows = self.db.execute(
+                f'SELECT token, value FROM memo WHERE step = ? AND version = ? AND token IN ({",".join("?" * len(batch))})',
+                [step, version, *batch]
+            )
+            found.update(rows)
+        return found
+
+    def lookup(self, fn: Callable[[str], Optional[str]], tokens: Iterable[str], version='') -> dict:
+        """
+        Applies `fn` to every token, reusing memoized results.
+        :return: replacement dict of the tokens which `fn` changed
+        """
+        step, version = fn.__name__, self.version(fn, version)
+        results, missing = {}, []
+        for token in tokens:
+            key = (step, version, token)
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                results[token] = self.cache[key]
+                self.stats['hits'] += 1
+            else:
+                missing.append(token)
+
+        stored = self._load(step, version, missing) if missing else {}
+        computed = []
+        for token in missing:
+            if token in stored:
+                value = stored[token]
+                self.stats['stored'] += 1
+            else:
+                value = fn(token)
+                value = value if value != token else None
+                computed.append((step, version, token, value))
+                self.stats['computed'] += 1
+            results[token] = value
+            self._remember((step, version, token), value)
+
+        if computed:
+            self.db.executemany('INSERT OR REPLACE INTO memo VALUES (?, ?, ?, ?)', computed)
+            self.db.commit()
+        return {token: value for token, value in results.items() if value is not None}
+
+    def close(self):
+        self.db.close()
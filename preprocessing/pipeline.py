@@ -0,0 +1,167 @@
+import hashlib
+import os
+import pathlib
+import re
+import time
+from multiprocessing import Pool
+
+import pandas as pd
+import psutil
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from preprocessing.profiling import StepProfiler, summarize
+from preprocessing.rewriter import TokenRewriter
+from utils.datasets import ensure_dataset, seed_everything
+
+# Stored in the schema metadata of every output chunk, so unchanged inputs are not processed again
+INPUT_HASH_KEY = b'bigsentiment.input_hash'
+SEED = 42
+
+
+def input_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_processed(output_path, digest):
+    if not os.path.exists(output_path):
+        return False
+    try:
+        metadata = pq.read_schema(output_path).metadata or {}
+    except pa.ArrowInvalid:
+        return False
+    return metadata.get(INPUT_HASH_KEY) == digest.encode()
+
+
+def run_steps(phase, step_list, rw, profiler=None):
+    if profiler is None:
+        for step in step_list:
+            step(rw)
+    else:
+        for step in step_list:
+            profiler.run(phase, step, rw)
+
+
+def run_text_step(phase, fn, texts, tokens, profiler=None):
+    if profiler is None:
+        return fn(texts)
+    with profiler.measure(phase, fn.__name__, tokens=tokens):
+        return fn(texts)
+
+
+def clean_texts(texts: pd.Series, profiler: StepProfiler = None):
+    """
+    Runs all cleaning steps over the texts.
+    :return: the cleaned texts and the number of tokens of the input
+    """
+    from preprocessing import steps
+
+    rw = TokenRewriter(texts, steps.check_replace, steps.local_vocab)
+    tokens = rw.index.total
+    if steps.verbose: print('#' * 20, 'Initial State:'); rw.index.report()
+    run_steps('pre', steps.PRE_STEPS, rw, profiler)
+    texts = run_text_step('pre', TokenRewriter.rewrite, rw, tokens, profiler)
+    texts = run_text_step('text', steps.remove_hrefs, texts, tokens, profiler)
+
+    rw = TokenRewriter(texts, steps.check_replace, steps.local_vocab)
+    run_steps('tokens', steps.STEPS, rw, profiler)
+    return run_text_step('tokens', TokenRewriter.rewrite, rw, rw.index.total, profiler), tokens
+
+
+def init_worker(verbose):
+    # Helpers are loaded once per worker and reused for all of its chunks
+    from preprocessing import steps
+
+    steps.verbose = verbose
+    seed_everything(SEED)
+
+
+def language_mask(texts):
+    from preprocessing import steps
+    return texts.map(steps.langcheck)
+
+
+def process_chunk(args):
+    input_path, output_path, name, digest, profile_dir = args
+    from preprocessing import steps
+
+    start = time.time()
+    # Profiling is opt-in, without profiler the steps run as plain calls
+    profiler = StepProfiler(name) if profile_dir else None
+    data = pd.read_parquet(input_path)
+    texts, tokens = clean_texts(data['text'].astype(str), profiler)
+
+    # Cut away non english tweets
+    mask = run_text_step('text', language_mask, texts, tokens, profiler)
+    if steps.verbose: print(f'Deleted: {1 - sum(mask) / len(texts)}')
+    data = data[mask]
+    data['text'] = texts[mask]
+
+    table = pa.Table.from_pandas(data)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), INPUT_HASH_KEY: digest.encode()})
+    # Written under a temporary name, so interrupted chunks are never taken for processed ones
+    pq.write_table(table, output_path + '.tmp')
+    os.replace(output_path + '.tmp', output_path)
+    if profiler is not None:
+        profiler.save(os.path.join(profile_dir, os.path.splitext(name)[0]))
+    return {
+        'chunk': name,
+        'rows': len(mask),
+        'kept': len(data),
+        'tokens': tokens,
+        'seconds': time.time() - start,
+        'profile': profiler.records if profiler is not None else None,
+    }
+
+
+def chunk_key(name):
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+def run(input_dir, output_dir, workers=None, offset=0, force=False, verbose=False, profile=False):
+    """
+    Cleans every `part_*.parquet` chunk of `input_dir` and its subdirectories (the shards of a parallel export) into
+    the chunk with the same relative path in `output_dir`. Chunks are processed in parallel, one chunk per worker.
+    Chunks which were already processed from the same input are skipped unless `force` is set.
+    :param profile: write per step timings, memory and vocabulary statistics of every chunk to `output_dir/profile`
+    """
+    ensure_dataset(output_dir)
+    profile_dir = os.path.join(output_dir, 'profile') if profile else None
+    names = [str(file.relative_to(input_dir)) for file in pathlib.Path(input_dir).glob('**/part_*.parquet')]
+    names = sorted(names, key=chunk_key)[offset:]
+
+    tasks, skipped = [], 0
+    for name in names:
+        input_path, output_path = os.path.join(input_dir, name), os.path.join(output_dir, name)
+        digest = input_hash(input_path)
+        if not force and is_processed(output_path, digest):
+            skipped += 1
+            continue
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        tasks.append((input_path, output_path, name, digest, profile_dir))
+    print(f'Processing {len(tasks)} chunks, skipped {skipped} processed chunks')
+    if not tasks:
+        return []
+
+    workers = min(workers or psutil.cpu_count(), len(tasks))
+    start, results = time.time(), []
+    with Pool(workers, initializer=init_worker, initargs=(verbose,)) as pool:
+        for result in pool.imap_unordered(process_chunk, tasks):
+            results.append(result)
+            seconds = max(result['seconds'], 1e-6)
+            print(f'{result["chunk"]}: {result["rows"]} rows ({result["kept"]} kept) in {seconds:.1f}s. '
+                  f'{result["rows"] / seconds:.0f} rows/s, {result["tokens"] / seconds:.0f} tokens/s')
+
+    elapsed = max(time.time() - start, 1e-6)
+    rows, tokens = sum(r['rows'] for r in results), sum(r['tokens'] for r in results)
+    print(f'Processed {rows} rows in {len(results)} chunks in {elapsed:.1f}s with {workers} workers. '
+          f'{rows / elapsed:.0f} rows/s, {tokens / elapsed:.0f} tokens/s')
+    if profile:
+        print(f'Slowest steps (reports in {profile_dir}):')
+        for total in summarize([record for result in results for record in result['profile']]):
+            print(f'{total["step"]}: {total["seconds"]:.2f}s in {total["calls"]} calls')
+    return results
@@ -0,0 +1,79 @@
+import csv
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from utils.datasets import get_peak_rss, get_rss
+
+FIELDS = [
+    'chunk', 'phase', 'position', 'step', 'seconds', 'tokens', 'tokens_per_sec',
+    'rss_delta', 'peak_rss_delta', 'replacements', 'vocabulary', 'unknown', 'hit_rate',
+]
+
+
+class StepProfiler:
+    """
+    Records wall time, memory and vocabulary statistics of every cleaning step of a chunk. The pipeline only
+    creates a profiler when profiling is enabled, so disabled profiling adds no work to the steps.
+    """
+
+    def __init__(self, chunk):
+        self.chunk = chunk
+        self.records = []
+
+    @contextmanager
+    def measure(self, phase, step, rw=None, tokens=None):
+        """
+        Measures the wrapped code. Vocabulary statistics are taken from the rewriter `rw` after the step, text
+        level steps without rewriter only give the number of `tokens` they processed.
+        """
+        replaced = rw.replaced if rw is not None else 0
+        rss, peak = get_rss(), get_peak_rss()
+        start = time.perf_counter()
+        yield
+        seconds = time.perf_counter() - start
+
+        tokens = rw.index.total if rw is not None else tokens
+        record = {
+            'chunk': self.chunk,
+            'phase': phase,
+            'position': len(self.records),
+            'step': step,
+            'seconds': round(seconds, 6),
+            'tokens': tokens,
+            'tokens_per_sec': round(tokens / seconds) if tokens is not None and seconds > 0 else None,
+            'rss_delta': get_rss() - rss,
+            'peak_rss_delta': get_peak_rss() - peak,
+            'replacements': rw.replaced - replaced if rw is not None else None,
+            'vocabulary': len(rw.index) if rw is not None else None,
+            'unknown': len(rw.index.unknown_list()) if rw is not None else None,
+            'hit_rate': round(rw.index.hit_rate(), 4) if rw is not None else None,
+        }
+        self.records.append(record)
+
+    def run(self, phase, step, rw):
+        with self.measure(phase, step.__name__, rw):
+            step(rw)
+
+    def save(self, path):
+        """
+        Writes the records to `path.json` and `path.csv`.
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.json', 'w') as f:
+            json.dump({'chunk': self.chunk, 'steps': self.records}, f, indent=2)
+        with open(path + '.csv', 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(self.records)
+
+
+def summarize(records, top=10):
+    # Total time per step over all chunks (steps which run multiple times are summed)
+    totals = {}
+    for record in records:
+        total = totals.setdefault(record['step'], {'step': record['step'], 'seconds': 0., 'calls': 0})
+        total['seconds'] += record['seconds']
+        total['calls'] += 1
+    return sorted(totals.values(), key=lambda total: total['seconds'], reverse=True)[:top]
@@ -0,0 +1,96 @@
+from collections import Counter
+from itertools import chain
+from typing import Callable, Dict, Iterable, List, Set
+
+import pandas as pd
+
+from preprocessing.vocab import VocabIndex
+
+
+class TokenRewriter:
+    """
+    Rewrites the whitespace separated tokens of a corpus through a chain of replacement steps without touching the
+    texts in between. Every unique token of the corpus is mapped to the tokens it was rewritten to so far, a step
+    only builds a replacement dict from the current vocabulary and updates that mapping. `rewrite` applies the
+    composed mapping to the texts in a single pass.
+
+    Since every step replaces single tokens by strings which are split again, composing the replacements gives the
+    same tokens as rewriting the texts after every step (whitespace is normalized to single spaces).
+
+    The current tokens are tracked in a `VocabIndex` (weighted by how often their originals occur) and an inverse
+    index to the originals they occur in, so a replacement only touches the originals containing a replaced token.
+    """
+
+    def __init__(self, texts: pd.Series, is_mutable: Callable[[str], bool] = None, vocabulary=None):
+        self.texts = texts
+        self.is_mutable = is_mutable
+        self.occurrences = Counter(chain.from_iterable(text.split() for text in texts))
+        self.mapping: Dict[str, List[str]] = {token: [token] for token in self.occurrences}
+        self.originals: Dict[str, Set[str]] = {token: {token} for token in self.occurrences}
+        self.index = VocabIndex(vocabulary, self.occurrences)
+        self.mutable_cache = {}
+        # Number of unique tokens replaced so far
+        self.replaced = 0
+
+    def vocabulary(self) -> set:
+        return self.index.tokens()
+
+    def chars(self) -> set:
+        return set(chain.from_iterable(self.index))
+
+    def unknown(self) -> list:
+        return self.index.unknown_list()
+
+    def mutable(self, token) -> bool:
+        if self.is_mutable is None:
+            return True
+        if token not in self.mutable_cache:
+            self.mutable_cache[token] = self.is_mutable(token)
+        return self.mutable_cache[token]
+
+    def replace(self, replacements: dict, skip_check=False) -> int:
+        """
+        Replaces every current token which is a key of `replacements` (and mutable unless `skip_check`) by its
+        value. Values may contain spaces, they are split into multiple tokens.
+        :return: the number of original tokens which changed
+        """
+        replacements = {
+            token: value.split() for token, value in replacements.items()
+            if token != value and token in self.originals and (skip_check or self.mutable(token))
+        }
+        if not replacements:
+            return 0
+
+        self.replaced += len(replacements)
+        affected = set(chain.from_iterable(self.originals[token] for token in replacements))
+        for original in affected:
+            tokens = self.mapping[original]
+            new_tokens = [new for token in tokens for new in replacements.get(token, (token,))]
+            self.mapping[original] = new_tokens
+            self.index.update(tokens, new_tokens, self.occurrences[original])
+            for token in set(tokens):
+                originals = self.originals[token]
+                originals.discard(original)
+                if not originals:
+                    del self.originals[token]
+            for token in new_tokens:
+                self.originals.setdefault(token, set()).add(original)
+        return len(affected)
+
+    def map(self, fn: Callable[[str], str], skip_check=False, tokens: Iterable[str] = None) -> dict:
+        """
+        Replaces the current tokens (or the given ones) by `fn(token)`.
+        :return: the applied replacements
+        """
+        replacements = {}
+        for token in tokens if tokens is not None else self.vocabulary():
+            if skip_check or self.mutable(token):
+                value = fn(token)
+                if value != token:
+                    replacements[token] = value
+        self.replace(replacements, skip_check=True)
+        return replacements
+
+    def rewrite(self) -> pd.Series:
+        final = {original: ' '.join(tokens) for original, tokens in self.mapping.items()}
+        return self.texts.map(lambda text: ' '.join(filter(None, (final[token] for token in text.split()))))
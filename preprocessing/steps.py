@@ -0,0 +1,927 @@
+# Credit for some parts to: https://www.kaggle.com/kyakovlev/preprocessing-bert-public
+# Number extraction and hashtags is my baby
+import functools
+import inspect
+import itertools
+import os
+import re
+import unicodedata
+from collections import Counter
+
+import emoji
+from bs4 import BeautifulSoup
+from gensim.utils import deaccent
+
+from preprocessing.memo import MemoStore
+from utils.datasets import DATASET_DIR, domain_search, print_dict
+from utils.helpers import helper_version, load_helper_file, load_helper_vocabulary
+
+verbose = False
+WPLACEHOLDER = 'word_placeholder'
+URL_TAG = '@URL'
+USER_TAG = '@USR'
+NUMBER_TAG = '@NUM'
+HASH_TAG = '@HTAG'
+CURRENCY_TAG = '@CURR'
+TIME_TAG = '@TIME'
+DATE_TAG = '@DATE'
+IMMUTABLES = [
+    WPLACEHOLDER,
+    URL_TAG, USER_TAG, NUMBER_TAG, HASH_TAG, CURRENCY_TAG,
+    TIME_TAG, DATE_TAG
+]
+MEMO_PATH = os.path.join(DATASET_DIR, 'cache/preprocess_memo.sqlite')
+LANGUAGE_MODEL_PATH = os.path.join(DATASET_DIR, 'kaggle/lid.176.ftz')
+
+
+## Preprocess helpers
+def place_hold(w, tag=WPLACEHOLDER):
+    return tag + '[' + re.sub(' ', '___', w) + ']'
+
+
+## Helpers
+def check_replace(w):
+    return not bool(re.search('|'.join(IMMUTABLES), w))
+
+
+def make_cleaning(s, c_dict):
+    if check_replace(s):
+        s = s.translate(c_dict)
+    return s
+
+
+## Get basic helper data
+
+bert_uncased_vocabulary = load_helper_vocabulary('helper_bert_uncased_vocabulary')
+bert_cased_vocabulary = load_helper_vocabulary('helper_bert_cased_vocabulary')
+bert_char_list = list(set([c for line in itertools.chain(bert_uncased_vocabulary, bert_cased_vocabulary) for c in line]))
+
+url_extensions = load_helper_file('helper_url_extensions')
+html_tags = load_helper_file('helper_html_tags')
+good_chars_dieter = load_helper_file('helper_good_chars_dieter')
+bad_chars_dieter = load_helper_file('helper_bad_chars_dieter')
+helper_contractions = load_helper_file('helper_contractions')
+global_vocabulary = load_helper_vocabulary('helper_global_vocabulary')
+global_vocabulary_chars = load_helper_file('helper_global_vocabulary_chars')
+normalized_chars = load_helper_file('helper_normalized_chars')
+white_list_chars = load_helper_file('helper_white_list_chars')
+white_list_punct = " '*-.,?!/:;_()[]{}<>=" + '"'
+pictograms_to_emoji = load_helper_file('helper_pictograms_to_emoji')
+helper_custom_synonyms = load_helper_file('helper_custom_synonyms')
+helper_currency_synonyms = load_helper_file('helper_currency_synonyms')
+helper_custom_general_synonyms = load_helper_file('helper_custom_general_synonyms')
+emoji_dict = set(e for lang in emoji.UNICODE_EMOJI.values() for e in lang)
+
+## Preprocessing steps
+# Every step builds a replacement dict from the current (or unknown) vocabulary of the rewriter, the texts are only
+# rewritten once all token steps are applied. See preprocessing/rewriter.py
+
+local_vocab = bert_uncased_vocabulary
+global_lower = True
+
+VOCAB_VERSION = helper_version('helper_bert_uncased_vocabulary')
+
+
+@functools.lru_cache(maxsize=None)
+def get_memo() -> MemoStore:
+    # Word level decisions are memoized across chunks and runs, keyed by the helpers they depend on.
+    # Opened on first use, so every worker process has its own connection
+    return MemoStore(MEMO_PATH)
+
+
+def report(rw, label, temp_dict=None, chars=None):
+    if not verbose:
+        return
+    print('#' * 10, f'Step - {label}:'); rw.index.report()
+    if chars is not None: print(chars)
+    if temp_dict is not None: print_dict(temp_dict)
+
+
+def char_replacements(chars):
+    chars_dict = {}
+    for char in chars:
+        try:
+            new_char = unicodedata.name(char).split()[-1:][0].lower()
+            if len(new_char) == 1:
+                chars_dict[ord(char)] = new_char
+            else:
+                chars_dict[ord(char)] = ''
+        except:
+            chars_dict[ord(char)] = ''
+    return chars_dict
+
+
+def lower(rw):
+    rw.map(lambda x: x.lower(), skip_check=True)
+    report(rw, 'Lowering everything')
+
+
+# Normalize chars and dots - SEE HELPER FOR DETAILS
+def normalize_chars(rw):
+    rw.map(lambda x: make_cleaning(x, normalized_chars))
+    rw.map(lambda x: re.sub('\(dot\)', '.', x), skip_check=True)
+    rw.map(lambda x: deaccent(x), skip_check=True)
+    report(rw, 'Normalize chars and dots')
+
+
+def remove_control_chars(rw):
+    chars_dict = {c: '' for c in rw.chars() if unicodedata.category(c)[0] == 'C'}
+    rw.map(lambda x: make_cleaning(x, chars_dict))
+    report(rw, 'Control Chars')
+
+
+# Text level step, links span multiple tokens
+def remove_hrefs(texts):
+    texts = texts.apply(
+        lambda x: re.sub(re.findall(r'\<a(.*?)\>', x)[0], '', x) if (len(re.findall(r'\<a (.*?)\>', x)) > 0) and (
+                'href' in re.findall(r'\<a (.*?)\>', x)[0]) else x)
+    return texts
+
+
+# Convert or remove Bad Symbols
+def convert_remove_bad_symbols(rw):
+    chars = ''.join([c for c in rw.chars() if
+                     (c not in bert_char_list) and (c not in emoji_dict) and (c not in white_list_chars)])
+    chars_dict = char_replacements(chars)
+    rw.map(lambda x: make_cleaning(x, chars_dict))
+    report(rw, 'Remove Bad Symbols', chars_dict, chars)
+
+
+# Remove Bad Symbols PART 2
+def convert_remove_bad_symbols2(rw):
+    chars = '·' + ''.join([c for c in rw.chars() if
+                           (c not in white_list_chars) and (c not in emoji_dict) and (
+                                   c not in white_list_punct) and (ord(c) > 256)])
+    chars_dict = char_replacements(chars)
+    rw.map(lambda x: make_cleaning(x, chars_dict))
+    report(rw, 'Remove Bad Symbols PART 2', chars_dict, chars)
+
+
+def remove_html_tags(rw):
+    temp_vocab = [k for k in rw.vocabulary() if check_replace(k)]
+    temp_dict = {}
+    for word in temp_vocab:
+        if ('<' in word) and ('>' in word):
+            for tag in html_tags:
+                if ('<' + tag + '>' in word) or ('</' + tag + '>' in word):
+                    temp_dict[word] = BeautifulSoup(word, 'html5lib').text
+    rw.replace(temp_dict, skip_check=True)
+    report(rw, 'HTML tags', temp_dict)
+
+
+# Remove links (There is valuable information in links (probably you will find a way to use it))
+def remove_links(rw):
+    temp_vocab = [k for k in rw.vocabulary() if check_replace(k)]
+    url_rule = r'(?P<url>https?://[^\s]+)'
+    temp_dict = {k: domain_search(k) for k in temp_vocab if k != re.compile(url_rule).sub('url', k)}
+
+    for word in temp_dict:
+        new_value = temp_dict[word]
+        if word.find('http') > 2:
+            temp_dict[word] = word[:word.find('http')] + ' ' + place_hold(new_value, URL_TAG)
+        else:
+            temp_dict[word] = place_hold(new_value, URL_TAG)
+
+    rw.replace(temp_dict)
+    report(rw, 'Convert urls part 1', temp_dict)
+
+    # Remove twitter urls
+    temp_dict = {
+        f'{URL_TAG}[t.co]': ''
+    }
+    rw.replace(temp_dict, skip_check=True)
+    report(rw, 'Convert urls part 1.5')
+
+
+# Remove escaped html
+def remove_escaped_html(rw):
+    temp_vocab = [k for k in rw.vocabulary() if check_replace(k)]
+    symbols = {
+        '&quot;': '',
+        '&amp;': ' and ',
+        '&lt;': '',
+        '&gt;': '',
+    }
+    temp_dict = {}
+    for word in temp_vocab:
+        if any([rep in word for rep in symbols.keys()]):
+            new_word = word
+            for rep, to in symbols.items():
+                new_word = new_word.replace(rep, to)
+            temp_dict[word] = new_word
+
+    rw.replace(temp_dict, skip_check=True)
+    report(rw, 'Remove escaped html', temp_dict)
+
+
+# Convert urls part 2
+def convert_urls2(rw):
+    temp_vocab = [k for k in rw.vocabulary() if check_replace(k)]
+    temp_dict = {}
+
+    for word in temp_vocab:
+        url_check = False
+        if 'file:' in word:
+            url_check = True
+        elif ('http' in word) or ('ww.' in word) or ('.htm' in word) or ('ftp' in word) or ('.php' in word) or (
+                '.aspx' in word):
+            if 'Aww' not in word:
+                for d_zone in url_extensions:
+                    if '.' + d_zone in word:
+                        url_check = True
+                        break
+        elif ('/' in word) and ('.' in word):
+            for d_zone in url_extensions:
+                if '.' + d_zone + '/' in word:
+                    url_check = True
+                    break
+
+        if url_check:
+            temp_dict[word] = place_hold(domain_search(word), URL_TAG)
+
+    rw.replace(temp_dict)
+    report(rw, 'Convert urls part 2', temp_dict)
+
+
+# Normalize pictograms
+# Local (only unknown words)
+def normalize_pictograms(rw):
+    temp_vocab = [k for k in rw.unknown() if check_replace(k)]
+    temp_dict = {}
+    for word in temp_vocab:
+        if len(re.compile('[a-zA-Z0-9]').sub('', word)) > 2:
+            for pict in pictograms_to_emoji:
+                if (pict in word) and (len(pict) > 2):
+                    char_pict = pict[-1].isalpha() and pict[0].isalpha()
+                    if char_pict:
+                        pass
+                    else:
+                        temp_dict[word] = word.replace(pict, pictograms_to_emoji[pict])
+                elif pict == word:
+                    temp_dict[word] = pictograms_to_emoji[pict]
+
+    rw.replace(temp_dict)
+    report(rw, 'Normalize pictograms', temp_dict)
+
+
+def isolate_emoji(rw):
+    chars = ''.join([c for c in rw.chars() if c in emoji_dict])
+    chars_dict = {ord(c): f' {c} ' for c in chars}
+    rw.map(lambda x: make_cleaning(x, chars_dict))
+    report(rw, 'Isolate emoji', chars=chars)
+
+
+# Duplicated dots, question marks and exclamations
+def deduplicate_dots(rw):
+    temp_vocab = [k for k in rw.unknown() if check_replace(k)]
+    temp_dict = {}
+    for word in temp_vocab:
+        new_word = word
+        if (Counter(word)['.'] > 1) or (Counter(word)['!'] > 1) or (Counter(word)['?'] > 1) or (
+                Counter(word)[','] > 1):
+            if (Counter(word)['.'] > 1):
+                new_word = re.sub('\.\.+', ' . . . ', new_word)
+            if (Counter(word)['!'] > 1):
+                new_word = re.sub('\!\!+', ' ! ! ! ', new_word)
+            if (Counter(word)['?'] > 1):
+                new_word = re.sub('\?\?+', ' ? ? ? ', new_word)
+            if (Counter(word)[','] > 1):
+                new_word = re.sub('\,\,+', ' , , , ', new_word)
+            temp_dict[word] = new_word
+    temp_dict = {k: v for k, v in temp_dict.items() if k != v}
+    rw.replace(temp_dict)
+    report(rw, 'Duplicated Chars')
+
+
+# Remove underscore for spam words
+def remove_underscore_spam(rw):
+    temp_vocab = [k for k in rw.unknown() if check_replace(k)]
+    temp_dict = {}
+    for word in temp_vocab:
+        if (len(re.compile('[a-zA-Z0-9\-\.\,\/\']').sub('', word)) / len(word) > 0.6) and ('_' in word):
+            temp_dict[word] = re.sub('_', '', word)
+    rw.replace(temp_dict)
+    report(rw, 'Remove underscore', temp_dict)
+
+
+# Isolate spam chars repetition
+def isolate_spam_characters(rw):
+    temp_vocab = [k for k in rw.unknown() if check_replace(k)]
+    temp_dict = {}
+    for word in temp_vocab:
+        if (len(re.compile('[a-zA-Z0-9\-\.\,\/\']').sub('', word)) / len(word) > 0.6) and (
+                len(Counter(word)) == 1) and (len(word) > 2):
+            temp_dict[word] = ' '.join([' ' + next(iter(Counter(word).keys())) + ' ' for i in range(1)])
+    rw.replace(temp_dict)
+    report(rw, 'Spam chars repetition', temp_dict)
+
+
+# Normalize pictograms part 2
+# Local (only unknown words)
+def normalize_pictograms2(rw):
+    temp_vocab = [k for k in rw.unknown() if check_replace(k)]
+    temp_dict = {}
+    for word in temp_vocab:
+        if len(re.compile('[a-zA-Z0-9]').sub('', word)) > 1:
+            for pict in pictograms_to_emoji:
+                if pict == word:
+                    temp_dict[word] = pictograms_to_emoji[pict]
+    rw.replace(temp_dict)
+    report(rw, 'Normalize pictograms part 2', temp_dict)
+
+
+# Isolate brakets and quotes
+def isolate_brackets(rw):
+    chars = '()[]{}<>"'
+    chars_dict = {ord(c): f' {c} ' for c in chars}
+    rw.map(lambda x: make_cleaning(x, chars_dict))
+    report(rw, 'Brackets and quotes', chars_dict)
+
+
+# Extract date and time
+def extract_date_and_time_word(word):
+    re_inb = re.compile('[,\'"`]')
+    re_fix = re.compile('^[$£%€][-+][0-9]')
+    time_regex = re.compile('([0-9]{1,2}:[0-9]{1,2}:[0-9]{1,4})')
+    date_regex = re.compile('([0-9]{1,4}\/[0-9]{1,2}\/[0-9]{1,4})')
+    prefilter = re_inb.sub('', word).replace(',', '.')
+    if re_fix.search(prefilter):
+        prefilter = prefilter[1] + prefilter[0] + prefilter[2:]
+
+    ## -------- Time
+    time_result = time_regex.search(prefilter)
+    if time_result:
+        prefix = prefilter[:time_result.start()]
+        suffix = prefilter[time_result.end():]
+        mpart = prefilter[time_result.start():time_result.end()]
+        return ' '.join([
+            prefix,
+            place_hold(str(mpart), TIME_TAG),
+            suffix
+        ])
+
+    ## -------- Date
+    date_result = date_regex.search(prefilter.replace('-', '/'))
+    if date_result and len(word.split('/')) == 3:
+        prefix = prefilter[:date_result.start()]
+        suffix = prefilter[date_result.end():]
+        mpart = prefilter[date_result.start():date_result.end()]
+        return ' '.join([
+            prefix,
+            place_hold(str(mpart), DATE_TAG),
+            suffix
+        ])
+
+
+def extract_date_and_time(rw):
+    temp_vocab = [k for k in rw.unknown() if check_replace(k)]
+    temp_dict = get_memo().lookup(extract_date_and_time_word, temp_vocab)
+    rw.replace(temp_dict)
+    report(rw, 'Extract date and time', temp_dict)
+
+
+def custom_global_synonyms(rw):
+    temp_vocab = rw.unknown()
+    temp_dict = {}
+    for word in temp_vocab:
+        if word in helper_custom_general_synonyms:
+            temp_dict[word] = helper_custom_general_synonyms[word]
+
+    for k, v in list(temp_dict.items()):
+        if k == v:
+            temp_dict.pop(k)
+
+    rw.replace(temp_dict)
+    report(rw, 'Custom global word synonyms', temp_dict)
+
+
+# Break short words
+def break_short_words(rw):
+    temp_vocab = [k for k in rw.vocabulary() if check_replace(k)]
+    temp_vocab = [k for k in temp_vocab if len(k) <= 20]
+
+    temp_dict = {}
+    for word in temp_vocab:
+        if '/' in word and not word.startswith('u/') and not word.startswith('r/'):
+            temp_dict[word] = re.sub('/', ' / ', word)
+
+    rw.replace(temp_dict)
+    report(rw, 'Break short words', temp_dict)
+
+
+# Break long words
+def break_long_words(rw):
+    temp_vocab = [k for k in rw.vocabulary() if check_replace(k)]
+    temp_vocab = [k for k in temp_vocab if len(k) > 20]
+
+    temp_dict = {}
+    for word in temp_vocab:
+        if '_' in word and not (
+                len(word) > 2 and word[0] in ['#', '$', '@'] and word[1:len(word) - 1].replace('\'s', '').replace(
+            '_', '').isalnum()):
+            temp_dict[word] = re.sub('_', ' ', word)
+        elif '/' in word and not word.startswith('u/') and not word.startswith('r/'):
+            temp_dict[word] = re.sub('/', ' / ', word)
+        elif len(' '.join(word.split('-')).split()) > 2:
+            temp_dict[word] = re.sub('-', ' ', word)
+        for s in ',.:;':
+            if s in word and not re.compile('[+#@$/,.:;-]').sub('', word).isnumeric():
+                temp_dict[word] = word.replace(s, f' {s} ')
+
+    rw.replace(temp_dict)
+    report(rw, 'Break long words', temp_dict)
+
+
+# TODO: add number parsing before
+# Diambiguate entities
+# Split words on @,# and $ to clear up ambiguities between entitites
+def disambiguate_entitites(rw):
+    symbols = '@#$'
+    temp_vocab = [k for k in rw.unknown() if (check_replace(k)) and ('@' in k or '#' in k or '$' in k)]
+
+    temp_dict = {}
+    for word in temp_vocab:
+        for symbol in symbols:
+            if symbol not in word: continue
+            left, *right = word.split(symbol)
+            rightz = symbol.join(right)
+            if len(left) > 0 and len(right[0]) > 0 and right[0].isalnum():
+                temp_dict[word] = f'{left} {symbol}{rightz}'
+            break
+
+    rw.replace(temp_dict)
+    report(rw, 'Disambiguate entities', temp_dict)
+
+
+def custom_synonyms(rw):
+    temp_vocab = rw.unknown()
+    temp_dict = {}
+    for word in temp_vocab:
+        if word in helper_custom_synonyms:
+            temp_dict[word] = helper_custom_synonyms[word]
+
+    for k, v in list(temp_dict.items()):
+        if k == v:
+            temp_dict.pop(k)
+
+    rw.replace(temp_dict)
+    report(rw, 'Custom word synonyms', temp_dict)
+
+
+def custom_currency_synonyms(rw):
+    temp_vocab = rw.unknown()
+    temp_dict = {}
+    for word in temp_vocab:
+        if word in helper_currency_synonyms:
+            temp_dict[word] = helper_currency_synonyms[word]
+
+    for k, v in list(temp_dict.items()):
+        if k == v:
+            temp_dict.pop(k)
+
+    rw.replace(temp_dict)
+    report(rw, 'Custom currency synonyms', temp_dict)
+
+
+# Remove/Convert usernames and hashtags
+def extract_entities(rw):
+    temp_vocab = [k for k in rw.vocabulary() if check_replace(k)]
+    temp_dict = {}
+    for word in temp_vocab:
+        if (len(word) > 2) and (word[1:len(word) - 1].replace('\'s', '').replace('_', '').isalnum()):
+            new_word = word.replace('\'s', '')
+            if not re.compile('[#@$/,.:;]').sub('', new_word).isnumeric():
+                new_word = re.compile('[,.:;]').sub('', new_word)
+                if word.startswith('@'):
+                    temp_dict[word] = place_hold(new_word[1:], USER_TAG)
+                elif word.startswith('#'):
+                    temp_dict[word] = place_hold(new_word[1:], HASH_TAG)
+                elif word.startswith('u/'):
+                    temp_dict[word] = place_hold(new_word[2:], USER_TAG)
+                elif word.startswith('r/'):
+                    temp_dict[word] = place_hold(new_word[2:], HASH_TAG)
+                elif word.startswith('$') and new_word[1:].replace('_', '').isalpha():
+                    tag = CURRENCY_TAG if word[1:] in helper_currency_synonyms else HASH_TAG
+                    temp_dict[word] = place_hold(new_word[1:], tag)
+    temp_dict = {k: v for k, v in temp_dict.items() if k != v}
+    rw.replace(temp_dict)
+    report(rw, 'UserName and Hashtag', temp_dict)
+
+
+# Hashtag and currency union
+def hashtag_currency_union(rw):
+    temp_vocab = set([k for k in rw.vocabulary() if not check_replace(k)])
+    temp_dict = {}
+    for w in temp_vocab:
+        if w.startswith(CURRENCY_TAG):
+            if w.replace(CURRENCY_TAG, HASH_TAG) in temp_vocab:
+                temp_dict[w.replace(CURRENCY_TAG, HASH_TAG)] = w
+            if w.replace(CURRENCY_TAG, USER_TAG) in temp_vocab:
+                temp_dict[w.replace(CURRENCY_TAG, USER_TAG)] = w
+    rw.replace(temp_dict, skip_check=True)
+    report(rw, 'Hashtag and currency union', temp_dict)
+
+
+# Remove ending underscore (or add quotation marks???)
+def remove_ending_underscore(rw):
+    temp_vocab = [k for k in rw.unknown() if (check_replace(k)) and ('_' in k)]
+    temp_dict = {}
+    for word in temp_vocab:
+        new_word = word
+        if word[len(word) - 1] == '_':
+            for i in range(len(word), 0, -1):
+                if word[i - 1] != '_':
+                    new_word = word[:i]
+                    temp_dict[word] = new_word
+                    break
+    rw.replace(temp_dict)
+    report(rw, 'Remove ending underscore', temp_dict)
+
+
+# Remove starting underscore
+def remove_starting_underscore(rw):
+    temp_vocab = [k for k in rw.unknown() if (check_replace(k)) and ('_' in k)]
+    temp_dict = {}
+    for word in temp_vocab:
+        new_word = word
+        if word[0] == '_':
+            for i in range(len(word)):
+                if word[i] != '_':
+                    new_word = word[i:]
+                    temp_dict[word] = new_word
+                    break
+    rw.replace(temp_dict)
+    report(rw, 'Remove starting underscore', temp_dict)
+
+
+# End word punctuations
+def end_word_punctuations(rw):
+    temp_vocab = [k for k in rw.vocabulary() if (check_replace(k)) and (not k[len(k) - 1].isalnum())]
+    temp_dict = {}
+    for word in temp_vocab:
+        new_word = word
+        for i in range(len(word), 0, -1):
+            if word[i - 1].isnumeric() and re.compile('[$£%€]').match(word[i]):
+                break
+
+            if word[i - 1].isalnum():
+                new_word = word[:i] + ' ' + word[i:]
+                break
+        temp_dict[word] = new_word
+    temp_dict = {k: v for k, v in temp_dict.items() if k != v}
+    rw.replace(temp_dict)
+    report(rw, 'End word punctuations', temp_dict)
+
+
+scale_mapping = {
+    'b': 1000000000,
+    'bn': 1000000000,
+    'bln': 1000000000,
+    'billion': 1000000000,
+    'm': 1000000,
+    'mn': 1000000,
+    'mln': 1000000,
+    'million': 1000000,
+    'k': 1000,
+    'thousand': 1000,
+    '-': -1,
+}
+
+translate = {
+    '$': 'usd', '£': 'gbp', '%': 'percent', '€': 'eur'
+}
+
+translate_suffix = {
+    'x': 'times'
+}
+
+translate_prefix = {
+    '~': 'around',
+    '+-': 'around',
+    '±': 'around',
+    '@': 'at',
+    '=': 'equals',
+    '*#': 'ranked',
+    '#': 'ranked',
+}
+
+
+def serialize_number(word):
+    re_inb = re.compile('[,\'"`]')
+    re_num = re.compile('^(~|\+-|±|@|=|#|\*#)?[-@+*^#:]?[$£%€]?(([.:]?[0-9])+)[$£%€]?')
+    re_fix = re.compile('^[$£%€][-+][0-9]')
+    prefilter = re_inb.sub('', word).replace(',', '.')
+    if re_fix.search(prefilter):
+        prefilter = prefilter[1] + prefilter[0] + prefilter[2:]
+
+    ## ----- Various other numbers
+    result = re_num.search(prefilter)
+    if result and result.pos == 0:
+        # Process combined numbers / ranges in next iteration
+        if '-' in word and not word.startswith('-') and not word.startswith('+-'):
+            return ' '.join(word.split('-'))
+
+        main_part = prefilter[:result.end()]
+        prefix = ''
+        for prefix_key, prefix_name in translate_prefix.items():
+            if main_part.startswith(prefix_key):
+                prefix = prefix_name
+                main_part = main_part.replace(prefix_key, '', 1)
+                break
+
+        main = re.compile('^[~@+*^#:]').sub('', main_part)
+        currency = re.compile('[$£%€]').search(main)
+        currency = main[currency.start():currency.end()] if currency else None
+        main = re.compile('[$£%€]').sub('', main)
+        suffix = prefilter[result.end():]
+
+        multiplier = 1
+        if re.compile('\.[0-9]{1,2}$').search(main):  # decimal
+            multiplier *= 0.01 if main[-1].isnumeric() else 0.1
+        if '-' in main:  # Neg numbers
+            multiplier *= -1
+            main = main.replace('-', '')
+        # Textual scale
+        if suffix in scale_mapping:
+            multiplier *= scale_mapping[suffix]
+            suffix = ''
+        if suffix in translate_suffix:
+            suffix = translate_suffix[suffix]
+
+        number = round(float(main.replace('.', '').replace(':', '')) * multiplier, 2)
+        # noinspection PyTypeChecker
+        return ' '.join(filter(len, [
+            prefix,
+            place_hold(str(number), NUMBER_TAG),
+            translate[currency] if currency else '',
+            suffix
+        ]))
+
+
+# The mappings are part of the memo version, serialize_number depends on them
+SERIALIZE_VERSION = repr([scale_mapping, translate, translate_suffix, translate_prefix])
+
+
+def serialize_numbers(rw):
+    temp_vocab = [k for k in rw.unknown() if check_replace(k)]
+    temp_dict = get_memo().lookup(serialize_number, temp_vocab, SERIALIZE_VERSION)
+    rw.replace(temp_dict)
+    report(rw, 'Serialize numbers', temp_dict)
+
+
+# Start word punctuations
+def start_word_punctuations(rw):
+    temp_vocab = [k for k in rw.vocabulary() if
+                  (check_replace(k)) and (not k[0].isalnum() and k[0] not in ['@', '#', '$'])]
+    temp_dict = {}
+    for word in temp_vocab:
+        new_word = word
+        for i in range(len(word)):
+            if word[i].isalnum() or word[i] in ['#', '@', '$']:
+                new_word = word[:i] + ' ' + word[i:]
+                break
+        temp_dict[word] = new_word
+    temp_dict = {k: v for k, v in temp_dict.items() if k != v}
+    rw.replace(temp_dict)
+    report(rw, 'Start word punctuations', temp_dict)
+
+
+# Find and replace acronims
+def find_replace_acronyms(rw):
+    temp_vocab = [k for k in rw.unknown() if check_replace(k)]
+    temp_dict = {}
+    for word in temp_vocab:
+        if (Counter(word)['.'] > 1) and (check_replace(word)):
+            if (domain_search(word) != '') and (('www' in word) or (Counter(word)['/'] > 3)):
+                temp_dict[word] = place_hold('url ' + domain_search(word))
+            else:
+                if (re.compile('[\.\,]').sub('', word) in local_vocab) and (
+                        len(re.compile('[0-9\.\,\-\/\:]').sub('', word)) > 0):
+                    temp_dict[word] = place_hold(re.compile('[\.\,]').sub('', word))
+    temp_dict = {k: v for k, v in temp_dict.items() if k != v}
+    rw.replace(temp_dict)
+    report(rw, 'Find and replace acronims', temp_dict)
+
+
+# Apply spellchecker for contractions
+def apply_spellchecker_contractions(rw):
+    temp_vocab = [k for k in rw.unknown() if (check_replace(k)) and ("'" in k)]
+    temp_dict = {}
+    for word in temp_vocab:
+        if word in helper_contractions:
+            temp_dict[word] = helper_contractions[word]  # place_hold(helper_contractions[word])
+    rw.replace(temp_dict)
+    report(rw, 'Contractions', temp_dict)
+
+
+# Remove 's (DO WE NEED TO REMOVE IT???)
+def remove_comma_s(rw):
+    temp_vocab = [k for k in rw.unknown() if check_replace(k)]
+    temp_dict = {k: k[:-2] for k in temp_vocab if (check_replace(k)) and (k.lower()[-2:] == "'s")}
+    rw.replace(temp_dict)
+    report(rw, 'Remove "s', temp_dict)
+
+
+def convert_backslash(rw):
+    temp_vocab = [k for k in rw.unknown() if (check_replace(k)) and ('\\' in k)]
+    temp_dict = {k: re.sub('\\\\+', ' / ', k) for k in temp_vocab}
+    rw.replace(temp_dict)
+    report(rw, 'Convert backslash', temp_dict)
+
+
+# Try remove duplicated chars (not sure about this!!!!!). TODO check fist against vocab?
+# Only alphabetic words can collapse into an alphabetic vocabulary word
+def remove_duplicated_character_word(word):
+    if not word.isalpha():
+        return None
+    new_word = ''.join(ch for ch, _ in itertools.groupby(word))
+    if new_word in local_vocab:
+        return new_word
+
+
+def remove_duplicated_character(rw):
+    temp_vocab = [k for k in rw.unknown() if check_replace(k)]
+    temp_dict = get_memo().lookup(remove_duplicated_character_word, temp_vocab, VOCAB_VERSION)
+    rw.replace(temp_dict)
+    report(rw, 'Dup chars (with vocab check)', temp_dict)
+
+
+def isolate_numbers(rw):
+    temp_vocab = [k for k in rw.unknown() if check_replace(k)]
+    temp_dict = {}
+    for word in temp_vocab:
+        if re.compile('[a-zA-Z]').sub('', word) == word:
+            if re.compile('[0-9]').sub('', word) != word:
+                temp_dict[word] = word
+
+    temp_dict = {k: place_hold(k) for k in temp_dict}
+
+    # rw.replace(temp_dict)
+    report(rw, 'Isolate numbers', temp_dict)
+
+
+# Join dashes
+def join_dashes(rw):
+    temp_vocab = [k for k in rw.unknown() if check_replace(k)]
+
+    temp_dict = {}
+    for word in temp_vocab:
+        temp_dict[word] = re.sub('\-\-+', '-', word)
+    temp_dict = {k: v for k, v in temp_dict.items() if k != v}
+
+    rw.replace(temp_dict)
+    report(rw, 'Join dashes', temp_dict)
+
+
+# Try join word (Sloooow)
+def join_word_letters(rw):
+    temp_vocab = [k for k in rw.unknown() if (check_replace(k)) and (Counter(k)['-'] > 1)]
+
+    temp_dict = {}
+    for word in temp_vocab:
+        new_word = ''.join(['' if c in '-' else c for c in word])
+        if (new_word in local_vocab) and (len(new_word) > 3):
+            temp_dict[word] = new_word
+
+    rw.replace(temp_dict)
+    report(rw, 'Try Split word', temp_dict)
+
+
+# TODO: _ should become ' ' and we should preserve numbers or hashtags
+# Try Split word
+def split_words(rw):
+    temp_vocab = [k for k in rw.unknown() if check_replace(k)]
+
+    temp_dict = {}
+    for word in temp_vocab:
+        if len(re.compile('[a-zA-Z0-9\*]').sub('', word)) > 0:
+            chars = re.compile('[a-zA-Z0-9\*]').sub('', word)
+            temp_dict[word] = ''.join([' ' + c + ' ' if c in chars else c for c in word])
+
+    rw.replace(temp_dict)
+    report(rw, 'Try Split word', temp_dict)
+
+
+# L33T vocabulary (SLOW)
+# https://simple.wikipedia.org/wiki/Leet
+# Local (only unknown words)
+def convert_leet(word):
+    # basic conversion
+    word = re.sub('0', 'o', word)
+    word = re.sub('1', 'i', word)
+    word = re.sub('3', 'e', word)
+    word = re.sub('\$', 's', word)
+    word = re.sub('\@', 'a', word)
+    return word
+
+
+def convert_leet_word(word):
+    new_word = convert_leet(word)
+    if (new_word != word):
+        if (len(word) > 2) and (new_word in local_vocab):
+            return new_word
+
+
+def convert_leet_words(rw):
+    temp_vocab = [k for k in rw.unknown() if check_replace(k)]
+    temp_dict = get_memo().lookup(convert_leet_word, temp_vocab, VOCAB_VERSION + inspect.getsource(convert_leet))
+    rw.replace(temp_dict)
+    report(rw, 'L33T (with vocab check)', temp_dict)
+
+
+# Remove placeholders
+def remove_placeholders(rw):
+    temp_vocab = [k for k in rw.vocabulary() if (not check_replace(k) and k.startswith(WPLACEHOLDER))]
+    temp_dict = {}
+    for word in temp_vocab:
+        temp_dict[word] = re.sub('___', ' ', word[17:-1])
+    rw.replace(temp_dict, skip_check=True)
+    report(rw, 'Open Holded words')
+
+
+# Search multiple form
+# Local | example -> flashlights / flashlight -> False / True
+def search_multiple_form(rw):
+    temp_vocab = [k for k in rw.unknown() if (k[-1:] == 's') and (len(k) > 4)]
+    temp_dict = {k: k[:-1] for k in temp_vocab if (k[:-1] in local_vocab)}
+    rw.replace(temp_dict)
+    report(rw, 'Multiple form', temp_dict)
+
+
+# Cut away non english tweets
+@functools.lru_cache(maxsize=None)
+def language_model():
+    import fasttext
+    return fasttext.load_model(LANGUAGE_MODEL_PATH)
+
+
+def langcheck(item, min_confidence=0.2):
+    text = ' '.join([w for w in item.split() if not w.startswith('@')])
+    if len(text) < 3:
+        return True
+    results = dict(zip(*language_model().predict(text, k=2)))
+    return results.get('__label__en', 0) > min_confidence
+
+
+# Extract entities again and numbers
+EXTRACT_ENTITIES = [
+    custom_global_synonyms,
+    disambiguate_entitites,
+    serialize_numbers,
+    custom_synonyms,
+    custom_currency_synonyms,
+    extract_entities,
+    hashtag_currency_union,
+]
+EXTRACT_ENTITIES_NO_DISAMBIGUATION = [step for step in EXTRACT_ENTITIES if step is not disambiguate_entitites]
+
+# Steps before the (text level) href removal
+PRE_STEPS = [lower] if global_lower else []
+PRE_STEPS += [normalize_chars, remove_control_chars]
+STEPS = [
+    convert_remove_bad_symbols,
+    convert_remove_bad_symbols2,
+    remove_html_tags,
+    remove_links,
+    remove_escaped_html,
+    convert_urls2,
+    normalize_pictograms,
+    isolate_emoji,
+    deduplicate_dots,
+    remove_underscore_spam,
+    isolate_spam_characters,
+    normalize_pictograms2,
+    isolate_brackets,
+    extract_date_and_time,
+    custom_global_synonyms,
+    break_short_words,
+    *[break_long_words] * 3,
+    disambiguate_entitites,
+    custom_synonyms,
+    custom_currency_synonyms,
+    extract_entities,
+    hashtag_currency_union,
+    remove_ending_underscore,
+    remove_starting_underscore,
+    end_word_punctuations,
+    *[serialize_numbers] * 4,
+    *[step for step in EXTRACT_ENTITIES if step is not serialize_numbers],
+    start_word_punctuations,
+    *EXTRACT_ENTITIES,
+    find_replace_acronyms,
+    apply_spellchecker_contractions,
+    remove_comma_s,
+    convert_backslash,
+    *EXTRACT_ENTITIES,
+    remove_duplicated_character,
+    *EXTRACT_ENTITIES,
+    isolate_numbers,
+    join_dashes,
+    join_word_letters,
+    split_words,
+    convert_leet_words,
+    *EXTRACT_ENTITIES_NO_DISAMBIGUATION,
+    remove_placeholders,
+    search_multiple_form,
+    *EXTRACT_ENTITIES_NO_DISAMBIGUATION,
+]
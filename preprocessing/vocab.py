@@ -0,0 +1,64 @@
+from typing import Dict, Iterable
+
+
+class VocabIndex:
+    """
+    Token frequencies of a corpus together with whether every token is part of `vocabulary`. Built once and updated
+    as tokens are replaced, so unknown/known queries cost O(unique tokens) instead of re-tokenizing the corpus.
+    """
+
+    def __init__(self, vocabulary=None, counts: Dict[str, int] = None):
+        self.vocabulary = vocabulary
+        self.counts: Dict[str, int] = {}
+        self.known: Dict[str, bool] = {}
+        self.total = 0
+        for token, count in (counts or {}).items():
+            self.add(token, count)
+
+    def add(self, token, count=1):
+        self.total += count
+        if token in self.counts:
+            self.counts[token] += count
+        else:
+            self.counts[token] = count
+            self.known[token] = self.vocabulary is not None and token in self.vocabulary
+
+    def remove(self, token, count=1):
+        self.total -= count
+        self.counts[token] -= count
+        if self.counts[token] <= 0:
+            del self.counts[token]
+            del self.known[token]
+
+    def update(self, removed: Iterable[str], added: Iterable[str], count=1):
+        for token in removed:
+            self.remove(token, count)
+        for token in added:
+            self.add(token, count)
+
+    def __contains__(self, token):
+        return token in self.counts
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __iter__(self):
+        return iter(self.counts)
+
+    def tokens(self) -> set:
+        return set(self.counts)
+
+    def unknown_list(self) -> list:
+        return [token for token, known in self.known.items() if not known]
+
+    def known_list(self) -> list:
+        return [token for token, known in self.known.items() if known]
+
+    def hit_rate(self) -> float:
+        # Fraction of the token occurrences which are in the vocabulary
+        known = sum(count for token, count in self.counts.items() if self.known[token])
+        return known / self.total if self.total else 0.
+
+    def report(self):
+        unknown = len(self.unknown_list())
+        print('Unknown words:', unknown, '| Known words:', len(self.counts) - unknown)
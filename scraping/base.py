@@ -1,19 +1,18 @@
 import click
 
-from scraping.bitstamp import bitstamp
-from scraping.binance import binance
-from scraping.coinmarketcap import coinmarketcap
-from scraping.news import news
-from scraping.twitter import twitter
+from utils.flow import LazyGroup
 
 
-@click.group()
+@click.group(cls=LazyGroup, lazy_commands={
+    'twitter': 'scraping.twitter:twitter',
+    'news': 'scraping.news:news',
+    'binance': 'scraping.binance:binance',
+    'coinmarketcap': 'scraping.coinmarketcap:coinmarketcap',
+    'bitstamp': 'scraping.bitstamp:bitstamp',
+    'resample': 'scraping.resample:resample',
+    'market-store': 'scraping.market_store:market_store',
+    'gaps': 'scraping.gaps:gaps',
+    'dedup': 'scraping.dedup:dedup',
+})
 def scraper():
     pass
-
-
-scraper.add_command(twitter)
-scraper.add_command(news)
-scraper.add_command(binance)
-scraper.add_command(coinmarketcap)
-scraper.add_command(bitstamp)
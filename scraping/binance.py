@@ -9,6 +9,9 @@ import pendulum
 from pymongo.errors import BulkWriteError
 
 from config import mongodb
+from scraping.ratelimit import RateLimitedAdapter, limiter
+from scraping.resample import BASE_STEP, resample_symbol
+from utils.market import MarketStore
 
 TIMESTEPS = ['5m', '15m', '1h', '4h', '1d']
 KEYS = [
@@ -17,22 +20,54 @@ KEYS = [
 ]
 
 
-@click.command()
-@click.option('--symbols', default=['BTCUSDT'], help='Symbols to fetch data for', required=True, multiple=True)
-def binance(symbols):
-    logging.info(f'Scraping binance symbols. Symbols: {symbols}, Timeframes: {TIMESTEPS}')
+def fetch_range(client, store, output, symbol, step, from_dt, till_dt):
+    klines = client.get_historical_klines(
+        symbol,
+        step,
+        from_dt.strftime("%d %b %Y %H:%M:%S"),
+        till_dt.strftime("%d %b %Y %H:%M:%S")
+    )
+
+    if len(klines) == 0:
+        return 0
+
+    candles = [{**dict(zip(KEYS, line)), '_id': line[0]} for line in klines]
+    try:
+        output.insert_many(candles, ordered=False)
+    except BulkWriteError as e:
+        pass
+    if store:
+        store.append('binance', symbol, step, candles)
+    return len(candles)
+
 
+def create_client():
     client = Client(
         api_key=os.getenv('BINANCE_API_KEY'),
         api_secret=os.getenv('BINANCE_SECRET_KEY')
     )
+    client.session.mount('https://', RateLimitedAdapter(limiter))
+    return client
+
+
+@click.command()
+@click.option('--symbols', default=['BTCUSDT'], help='Symbols to fetch data for', required=True, multiple=True)
+@click.option('--derive', is_flag=True, default=False,
+              help='Only fetch the 5m candles and derive the other timeframes from them')
+@click.option('--parquet', is_flag=True, default=False, help='Also append the candles to the parquet market store')
+def binance(symbols, derive, parquet):
+    logging.info(f'Scraping binance symbols. Symbols: {symbols}, Timeframes: {TIMESTEPS}')
+
+    client = create_client()
 
     db = mongodb()
     scrapperdb = db['market']
     group = scrapperdb['binance']
+    store = MarketStore() if parquet else None
 
     for symbol in symbols:
-        for step in TIMESTEPS:
+        since = None
+        for step in ([BASE_STEP] if derive else TIMESTEPS):
             output = group[symbol][step]
             output.ensure_index([
                 ('timestamp', pymongo.ASCENDING),
@@ -43,26 +78,15 @@ def binance(symbols):
             start_dt = pendulum.DateTime(year=2017, month=1, day=1) if not last_item \
                 else pendulum.from_timestamp(int(last_item['timestamp']/1000)).replace(tzinfo=None)
             end_dt = pendulum.now().replace(tzinfo=None)
+            if step == BASE_STEP:
+                since = start_dt.replace(tzinfo=pendulum.UTC).int_timestamp
             period = pendulum.period(start_dt, end_dt)
             for from_dt in period.range('months'):
                 till_dt = from_dt.add(months=1)
 
-                klines = client.get_historical_klines(
-                    symbol,
-                    step,
-                    from_dt.strftime("%d %b %Y %H:%M:%S"),
-                    till_dt.strftime("%d %b %Y %H:%M:%S")
-                )
-
-                if len(klines) == 0:
-                    continue
-
-                try:
-                    output.insert_many(
-                        [{**dict(zip(KEYS, line)), '_id': line[0]} for line in klines],
-                        ordered=False
-                    )
-                except BulkWriteError as e:
-                    pass
+                fetch_range(client, store, output, symbol, step, from_dt, till_dt)
+
+        if derive:
+            resample_symbol(group, 'binance', symbol, since=since)
 
     logging.info(f'Finished scraping binance. Symbols: {symbols}, Timeframes: {TIMESTEPS}')
\ No newline at end of file
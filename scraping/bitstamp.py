@@ -1,18 +1,21 @@
 import logging
 import pathlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import click
 import os.path
 
 import pymongo
-import requests
 from binance.client import Client
 import pendulum
 from pymongo.errors import BulkWriteError
 import pandas as pd
-import time
+from tqdm import tqdm
 
 from config import mongodb
+from scraping.ratelimit import rate_limited_session, limiter
+from scraping.resample import BASE_STEP, resample_symbol
+from utils.market import MarketStore
 
 DATA_FOLDER = 'data/cryptodata'
 
@@ -26,23 +29,69 @@ TIMESTEPS = {
 
 ITEM_LIMIT = 1000
 
+BITSTAMP_HOST = 'www.bitstamp.net'
+
 USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_8_4) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/49.0.2656.18 Safari/537.36'
 
 ALLOWED_PAIRS = ['btcusd', 'btcusdc', 'xrpusd', 'ltcusd', 'ethusd', 'ethusdc', 'bchusd', 'paxusd', 'xlmusd', 'linkusd',
                  'omgusd']
 
 
+def fetch_window(session, symbol, delta, from_dt, till_dt):
+    result = session.get(f'https://www.bitstamp.net/api/v2/ohlc/{symbol}/', params={
+        'step': delta,
+        'start': from_dt.replace(tzinfo=pendulum.UTC).int_timestamp,
+        'end': till_dt.replace(tzinfo=pendulum.UTC).int_timestamp,
+        'limit': 1000
+    }, headers={
+        'User-Agent': USER_AGENT,
+    }).json()
+
+    klines = []
+    for tick_data in result['data']['ohlc']:
+        klines.append(tick_data)
+    return klines
+
+
+def store_window(store, output, symbol, step, klines):
+    if len(klines) == 0:
+        return 0
+
+    try:
+        output.insert_many(
+            [{**line, '_id': line['timestamp']} for line in klines],
+            ordered=False
+        )
+    except BulkWriteError as e:
+        pass
+    if store:
+        store.append('bitstamp', symbol, step, klines)
+    return len(klines)
+
+
 @click.command()
 @click.option('--symbols', default=ALLOWED_PAIRS, help='Symbols to fetch data for', required=True, multiple=True)
-def bitstamp(symbols):
-    logging.info(f'Scraping bitstamp symbols. Symbols: {symbols}, Timeframes: {TIMESTEPS}')
+@click.option('--concurrency', type=int, default=1, help='Number of windows to fetch in parallel')
+@click.option('--rate', type=float, default=None, help='Maximum number of requests per second to bitstamp')
+@click.option('--derive', is_flag=True, default=False,
+              help='Only fetch the 5m candles and derive the other timeframes from them')
+@click.option('--parquet', is_flag=True, default=False, help='Also append the candles to the parquet market store')
+def bitstamp(symbols, concurrency, rate, derive, parquet):
+    logging.info(f'Scraping bitstamp symbols. Symbols: {symbols}, Timeframes: {TIMESTEPS}, Concurrency: {concurrency}')
 
     db = mongodb()
     scrapperdb = db['market']
     group = scrapperdb['bitstamp']
-
+    if rate:
+        limiter.set_rate(BITSTAMP_HOST, rate)
+    session = rate_limited_session(pool_maxsize=max(concurrency, 10))
+    store = MarketStore() if parquet else None
+
+    # Schedule a job for every window of every (symbol, step) series
+    series = {}
+    steps = {BASE_STEP: TIMESTEPS[BASE_STEP]} if derive else TIMESTEPS
     for symbol in symbols:
-        for step, delta in reversed(TIMESTEPS.items()):
+        for step, delta in reversed(steps.items()):
             output = group[symbol][step]
             output.ensure_index([
                 ('timestamp', pymongo.ASCENDING),
@@ -54,32 +103,49 @@ def bitstamp(symbols):
 
             end_dt = pendulum.now().replace(tzinfo=None)
             period = pendulum.period(start_dt, end_dt)
-            for from_dt in period.range('seconds', delta * ITEM_LIMIT):
-                till_dt = from_dt.add(seconds=delta * ITEM_LIMIT)
-
-                time.sleep(1)
-                result = requests.get(f'https://www.bitstamp.net/api/v2/ohlc/{symbol}/', params={
-                    'step': delta,
-                    'start': from_dt.replace(tzinfo=pendulum.UTC).int_timestamp,
-                    'end': till_dt.replace(tzinfo=pendulum.UTC).int_timestamp,
-                    'limit': 1000
-                }, headers={
-                    'User-Agent': USER_AGENT,
-                }).json()
-
-                klines = []
-                for tick_data in result['data']['ohlc']:
-                    klines.append(tick_data)
-
-                if len(klines) == 0:
-                    continue
-
-                try:
-                    output.insert_many(
-                        [{**line, '_id': line['timestamp']} for line in klines],
-                        ordered=False
-                    )
-                except BulkWriteError as e:
-                    pass
-
-    logging.info(f'Finished scraping bitstamp. Symbols: {symbols}, Timeframes: {TIMESTEPS}')
+            series[(symbol, step)] = (output, [
+                (from_dt, from_dt.add(seconds=delta * ITEM_LIMIT))
+                for from_dt in period.range('seconds', delta * ITEM_LIMIT)
+            ])
+
+    # Windows are fetched in parallel (the shared rate limiter keeps the total request rate in check), but written in
+    # order per series. A restart resumes from the newest stored candle, so a window written before an earlier one
+    # which failed would leave a permanent hole. After a failure the rest of the series is left for the next run.
+    count = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {
+            executor.submit(fetch_window, session, symbol, TIMESTEPS[step], from_dt, till_dt): ((symbol, step), i)
+            for (symbol, step), (_, windows) in series.items()
+            for i, (from_dt, till_dt) in enumerate(windows)
+        }
+        fetched = {key: {} for key in series}
+        written = {key: 0 for key in series}
+        failed = set()
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            key, i = futures[future]
+            if key in failed:
+                continue
+            try:
+                fetched[key][i] = future.result()
+            except Exception as e:
+                failed.add(key)
+                fetched[key].clear()
+                for other, (other_key, _) in futures.items():
+                    if other_key == key:
+                        other.cancel()
+                logging.warning(f'Failed fetching bitstamp window, stopping {key} at {series[key][1][i][0]}: {e}')
+                continue
+
+            output = series[key][0]
+            while written[key] in fetched[key]:
+                count += store_window(store, output, *key, fetched[key].pop(written[key]))
+                written[key] += 1
+
+    if derive:
+        for symbol in symbols:
+            # The new base candles start at the first window of the series
+            windows = series[(symbol, BASE_STEP)][1]
+            since = windows[0][0].replace(tzinfo=pendulum.UTC).int_timestamp if windows else None
+            resample_symbol(group, 'bitstamp', symbol, since=since)
+
+    logging.info(f'Finished scraping bitstamp. Symbols: {symbols}, Timeframes: {TIMESTEPS}, Candles: {count}')
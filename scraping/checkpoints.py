@@ -0,0 +1,64 @@
+import datetime as dt
+
+import pymongo
+
+
+class CheckpointStore:
+    """
+    Persists scraping progress per (scope, query) in the `scrapper.checkpoints` collection.
+    Tracks the days which were fully scraped and the last scroll cursor of the days which are in progress, or for
+    incremental crawls the date of the newest item of the last finished crawl (high water mark).
+    """
+
+    def __init__(self, db, scope: str):
+        self.collection = db['checkpoints']
+        self.collection.ensure_index([
+            ('scope', pymongo.ASCENDING),
+            ('query', pymongo.ASCENDING),
+        ])
+        self.scope = scope
+
+    def _id(self, query):
+        return f'{self.scope}:{query}'
+
+    def load(self, query) -> dict:
+        return self.collection.find_one({'_id': self._id(query)}) or {'completed': [], 'cursors': {}}
+
+    def completed_days(self, query) -> set:
+        return set(self.load(query).get('completed', []))
+
+    def cursors(self, query) -> dict:
+        return self.load(query).get('cursors', {})
+
+    def save_cursor(self, query, day: str, cursor: str, page: int):
+        self.collection.update_one({'_id': self._id(query)}, {
+            '$set': {
+                'scope': self.scope,
+                'query': query,
+                f'cursors.{day}': {'cursor': cursor, 'page': page},
+                'updated_at': dt.datetime.utcnow(),
+            }
+        }, upsert=True)
+
+    def clear_cursor(self, query, day: str):
+        self.collection.update_one({'_id': self._id(query)}, {'$unset': {f'cursors.{day}': ''}})
+
+    def complete_day(self, query, day: str):
+        self.collection.update_one({'_id': self._id(query)}, {
+            '$set': {'scope': self.scope, 'query': query, 'updated_at': dt.datetime.utcnow()},
+            '$addToSet': {'completed': day},
+            '$unset': {f'cursors.{day}': ''},
+        }, upsert=True)
+
+    def high_water_mark(self, query):
+        return self.load(query).get('high_water_mark')
+
+    def save_high_water_mark(self, query, date):
+        # The mark never moves backwards, e.g. after a partial re-crawl
+        self.collection.update_one({'_id': self._id(query)}, {
+            '$set': {'scope': self.scope, 'query': query, 'updated_at': dt.datetime.utcnow()},
+            '$max': {'high_water_mark': date},
+        }, upsert=True)
+
+    def reset(self, query):
+        self.collection.delete_one({'_id': self._id(query)})
@@ -4,12 +4,14 @@ import click
 import os.path
 
 import pymongo
-import requests
 from binance.client import Client
 import pendulum
 from pymongo.errors import BulkWriteError
 
 from config import mongodb
+from scraping.ratelimit import rate_limited_session
+from scraping.resample import BASE_STEP, resample_symbol
+from utils.market import MarketStore
 
 TIMESTEPS = {
     '5m': 300,
@@ -28,19 +30,62 @@ USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_8_4) AppleWebKit/537.36
 
 
 
+def fetch_window(session, store, output, symbol, step, from_dt, till_dt):
+    sym_to, sym_from = symbol.split('-')
+    result = session.get('https://web-api.coinmarketcap.com/v1.1/cryptocurrency/quotes/historical', params={
+        'convert': f'{sym_to},{sym_from}',
+        'format': 'chart_crypto_details',
+        'symbol': sym_from,
+        'interval': step,
+        'time_end': till_dt.replace(tzinfo=pendulum.UTC).int_timestamp,
+        'time_start': from_dt.replace(tzinfo=pendulum.UTC).int_timestamp,
+        'skip_invalid': True
+    }, headers={
+        'User-Agent': USER_AGENT,
+    }).json()
+
+    if 'data' not in result:
+        if 'older than' in result['status']['error_message']:
+            return 0
+
+    klines = []
+    for tick_dt, tick_data in result['data'].items():
+        klines.append([
+            pendulum.parse(tick_dt).int_timestamp,
+            *tick_data[sym_to]
+        ])
+
+    if len(klines) == 0:
+        return 0
+
+    candles = [{**dict(zip(KEYS, line)), '_id': line[0]} for line in klines]
+    try:
+        output.insert_many(candles, ordered=False)
+    except BulkWriteError as e:
+        pass
+    if store:
+        store.append('coinmarketcap', symbol, step, candles)
+    return len(candles)
+
+
 @click.command()
 @click.option('--symbols', default=['USD-BTC'], help='Symbols to fetch data for', required=True, multiple=True)
-def coinmarketcap(symbols):
+@click.option('--derive', is_flag=True, default=False,
+              help='Only fetch the 5m candles and derive the other timeframes from them')
+@click.option('--parquet', is_flag=True, default=False, help='Also append the candles to the parquet market store')
+def coinmarketcap(symbols, derive, parquet):
     logging.info(f'Scraping coinmerketcap symbols. Symbols: {symbols}, Timeframes: {TIMESTEPS}')
 
     db = mongodb()
     scrapperdb = db['market']
     group = scrapperdb['coinmarketcap']
+    store = MarketStore() if parquet else None
+    session = rate_limited_session()
 
     for symbol in symbols:
-        sym_to, sym_from = symbol.split('-')
-
-        for step, delta in reversed(TIMESTEPS.items()):
+        since = None
+        steps = {BASE_STEP: TIMESTEPS[BASE_STEP]} if derive else TIMESTEPS
+        for step, delta in reversed(steps.items()):
             output = group[symbol][step]
             output.ensure_index([
                 ('timestamp', pymongo.ASCENDING),
@@ -51,42 +96,15 @@ def coinmarketcap(symbols):
                 else pendulum.from_timestamp(int(last_item['timestamp'])).replace(tzinfo=None)
 
             end_dt = pendulum.now().replace(tzinfo=None)
+            if step == BASE_STEP:
+                since = start_dt.replace(tzinfo=pendulum.UTC).int_timestamp
             period = pendulum.period(start_dt, end_dt)
             for from_dt in period.range('seconds', delta * ITEM_LIMIT):
                 till_dt = from_dt.add(seconds=delta * ITEM_LIMIT)
 
-                result = requests.get('https://web-api.coinmarketcap.com/v1.1/cryptocurrency/quotes/historical', params={
-                    'convert': f'{sym_to},{sym_from}',
-                    'format': 'chart_crypto_details',
-                    'symbol': sym_from,
-                    'interval': step,
-                    'time_end': till_dt.replace(tzinfo=pendulum.UTC).int_timestamp,
-                    'time_start': from_dt.replace(tzinfo=pendulum.UTC).int_timestamp,
-                    'skip_invalid': True
-                }, headers={
-                    'User-Agent': USER_AGENT,
-                }).json()
-
-                if 'data' not in result:
-                    if 'older than' in result['status']['error_message']:
-                        continue
-
-                klines = []
-                for tick_dt, tick_data in result['data'].items():
-                    klines.append([
-                        pendulum.parse(tick_dt).int_timestamp,
-                        *tick_data[sym_to]
-                    ])
-
-                if len(klines) == 0:
-                    continue
-
-                try:
-                    output.insert_many(
-                        [{**dict(zip(KEYS, line)), '_id': line[0]} for line in klines],
-                        ordered=False
-                    )
-                except BulkWriteError as e:
-                    pass
+                fetch_window(session, store, output, symbol, step, from_dt, till_dt)
+
+        if derive:
+            resample_symbol(group, 'coinmarketcap', symbol, since=since)
 
     logging.info(f'Finished scraping coinmarketcap. Symbols: {symbols}, Timeframes: {TIMESTEPS}')
\ No newline at end of file
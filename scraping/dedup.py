@@ -0,0 +1,180 @@
+import hashlib
+import logging
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+import bson
+import click
+import numpy as np
+import pymongo
+from numpy.lib.stride_tricks import sliding_window_view
+from pymongo import ReplaceOne, UpdateOne
+
+from config import mongodb
+from utils.datasets import batched
+
+# Signature parameters. The index has to be rebuilt (--rebuild) when they change
+NUM_PERM = 128
+BANDS = 16
+SHINGLE_SIZE = 5
+SEED = 42
+
+
+@dataclass
+class Corpus:
+    collection: str
+    # Documents are processed oldest first, so the earliest copy is kept as the original
+    sort: str
+    fields: tuple
+
+
+CORPORA = {
+    'tweets': Corpus(collection='tweets', sort='created_at', fields=('text',)),
+    'news': Corpus(collection='news', sort='date', fields=('title', 'text')),
+}
+
+re_url = re.compile(r'https?://\S+')
+re_space = re.compile(r'\s+')
+
+
+def normalize(text):
+    # Links are dropped since copies of a tweet often get their own shortened urls
+    return re_space.sub(' ', re_url.sub(' ', text.lower())).strip()
+
+
+class MinHasher:
+    """
+    MinHash signatures over hashed character shingles. Shingles are hashed with a polynomial rolling hash and
+    permuted with multiply-shift hashing, both vectorized over the whole document.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, seed=SEED):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.a = rng.randint(0, 2 ** 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.randint(0, 2 ** 63, num_perm, dtype=np.uint64)
+        self.powers = np.uint64(1099511628211) ** np.arange(shingle_size - 1, -1, -1, dtype=np.uint64)
+
+    def shingles(self, text) -> np.ndarray:
+        data = np.frombuffer(normalize(text).encode('utf-8'), dtype=np.uint8).astype(np.uint64)
+        if len(data) == 0:
+            return data
+        if len(data) < self.shingle_size:
+            data = np.pad(data, (0, self.shingle_size - len(data)))
+        return np.unique(sliding_window_view(data, self.shingle_size) @ self.powers)
+
+    def signature(self, text) -> Optional[np.ndarray]:
+        shingles = self.shingles(text)
+        if len(shingles) == 0:
+            return None
+        hashes = np.outer(shingles, self.a) + self.b
+        return (hashes >> np.uint64(32)).astype(np.uint32).min(axis=0)
+
+
+def band_keys(signature: np.ndarray, bands=BANDS):
+    # Band hashes are stable across processes (unlike python's hash) so they can be persisted
+    return [
+        int.from_bytes(hashlib.blake2b(bytes([i]) + band.tobytes(), digest_size=8).digest(), 'little', signed=True)
+        for i, band in enumerate(np.split(signature, bands))
+    ]
+
+
+def similarity(a: np.ndarray, b: np.ndarray):
+    return float(np.mean(a == b))
+
+
+class SignatureIndex:
+    """
+    Persistent LSH index of the signatures of the original (non duplicate) documents. Every signature is split in
+    `bands` bands, documents sharing a band are candidates. Candidates are looked up through a multikey index on the
+    band hashes, so the lookup cost depends on the number of candidates rather than the corpus size.
+    """
+
+    def __init__(self, collection, threshold=0.8, bands=BANDS):
+        self.collection = collection
+        self.collection.ensure_index([('bands', pymongo.ASCENDING)])
+        self.threshold = threshold
+        self.bands = bands
+
+    def reset(self):
+        self.collection.delete_many({})
+
+    def deduplicate(self, docs, signatures):
+        """
+        Returns the original of every document or None if it is an original itself. Documents of the same batch are
+        matched against each other as well, new originals are added to the index. Documents without text (no
+        signature) are never duplicates.
+        """
+        keys = [band_keys(signature, self.bands) if signature is not None else [] for signature in signatures]
+        buckets, known = {}, {}
+        for doc in self.collection.find({'bands': {'$in': list({k for ks in keys for k in ks})}}):
+            known[doc['_id']] = np.frombuffer(doc['signature'], dtype=np.uint32)
+            for key in doc['bands']:
+                buckets.setdefault(key, []).append(doc['_id'])
+
+        originals, inserts = [], []
+        for doc, signature, doc_keys in zip(docs, signatures, keys):
+            if signature is None:
+                originals.append(None)
+                continue
+            candidates = {c for key in doc_keys for c in buckets.get(key, []) if c != doc['_id']}
+            best = max(candidates, key=lambda c: similarity(signature, known[c]), default=None)
+            if best is not None and similarity(signature, known[best]) >= self.threshold:
+                originals.append(best)
+                continue
+
+            originals.append(None)
+            known[doc['_id']] = signature
+            for key in doc_keys:
+                buckets.setdefault(key, []).append(doc['_id'])
+            inserts.append(ReplaceOne({'_id': doc['_id']}, {
+                '_id': doc['_id'],
+                'signature': bson.Binary(signature.tobytes()),
+                'bands': doc_keys,
+            }, upsert=True))
+
+        if inserts:
+            self.collection.bulk_write(inserts, ordered=False)
+        return originals
+
+
+@click.command()
+@click.option('--corpus', type=click.Choice(list(CORPORA)), required=True, help='Collection to deduplicate')
+@click.option('--threshold', type=float, default=0.8, help='Minimum estimated jaccard similarity of duplicates')
+@click.option('--batch-size', type=int, default=5000, help='Number of documents which are processed at once')
+@click.option('--rebuild', is_flag=True, default=False, help='Rebuild the signature index from scratch')
+def dedup(corpus, threshold, batch_size, rebuild):
+    """
+    Marks near-duplicate documents with the `_id` of their original in `duplicate_of` (null for originals).
+    Only documents which were not checked before are processed, exports skip the marked ones.
+    """
+    corpus = CORPORA[corpus]
+    scrapperdb = mongodb()['scrapper']
+    collection = scrapperdb[corpus.collection]
+    index = SignatureIndex(scrapperdb[f'signatures.{corpus.collection}'], threshold=threshold)
+    if rebuild:
+        index.reset()
+        collection.update_many({'duplicate_of': {'$exists': True}}, {'$unset': {'duplicate_of': ''}})
+
+    hasher = MinHasher()
+    projection = {'_id': 1, **{f: 1 for f in corpus.fields}}
+    cursor = collection.find({'duplicate_of': {'$exists': False}}, projection) \
+        .sort(corpus.sort, pymongo.ASCENDING)
+    logging.info(f'Deduplicating {corpus.collection}. Threshold: {threshold}')
+
+    checked, duplicates = 0, 0
+    for docs in batched(cursor, batch_size):
+        signatures = [hasher.signature(' '.join(doc.get(f) or '' for f in corpus.fields)) for doc in docs]
+        originals = index.deduplicate(docs, signatures)
+        collection.bulk_write([
+            UpdateOne({'_id': doc['_id']}, {'$set': {'duplicate_of': original}})
+            for doc, original in zip(docs, originals)
+        ], ordered=False)
+
+        checked += len(docs)
+        duplicates += sum(1 for original in originals if original is not None)
+        logging.debug(f'Checked {checked} {corpus.collection}, {duplicates} duplicates')
+
+    logging.info(f'Finished deduplicating {corpus.collection}. Checked: {checked}, Duplicates: {duplicates}')
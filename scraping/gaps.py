@@ -0,0 +1,169 @@
+import logging
+from dataclasses import dataclass, field
+from typing import List
+
+import click
+import pendulum
+import pymongo
+
+from config import mongodb
+from scraping.resample import BASE_STEP, SCHEMAS, TIMESTEPS, resample_symbol
+from utils.market import MarketStore
+
+SOURCES = list(SCHEMAS)
+
+# Maximum number of candles which are requested at once per source
+WINDOW_CANDLES = {
+    'bitstamp': 1000,
+    'coinmarketcap': 9000,
+    'binance': 30000,
+}
+
+
+@dataclass
+class Gap:
+    # Unix seconds of the first missing candle and of the first candle after the gap
+    start: int
+    end: int
+    delta: int
+
+    @property
+    def candles(self):
+        return (self.end - self.start) // self.delta
+
+    def __str__(self):
+        return f'{pendulum.from_timestamp(self.start).to_datetime_string()} - ' \
+               f'{pendulum.from_timestamp(self.end).to_datetime_string()} ({self.candles} candles)'
+
+
+@dataclass
+class Coverage:
+    delta: int
+    first: int = None
+    last: int = None
+    count: int = 0
+    gaps: List[Gap] = field(default_factory=list)
+
+    @property
+    def expected(self):
+        return 0 if self.first is None else (self.last - self.first) // self.delta + 1
+
+    @property
+    def missing(self):
+        return sum(gap.candles for gap in self.gaps)
+
+    @property
+    def ratio(self):
+        return self.count / self.expected if self.expected else 1.0
+
+
+def scan_gaps(collection, delta: int, unit: int = 1, min_candles: int = 1) -> Coverage:
+    """
+    Streams the timestamps of a candle collection through its timestamp index and reports the missing ranges.
+    Only the `timestamp` field is projected so the query is covered by the index.
+    """
+    coverage = Coverage(delta=delta)
+    cursor = collection.find({}, {'_id': 0, 'timestamp': 1}) \
+        .sort('timestamp', pymongo.ASCENDING) \
+        .hint([('timestamp', pymongo.ASCENDING)]) \
+        .batch_size(100000)
+
+    previous = None
+    for doc in cursor:
+        timestamp = int(doc['timestamp']) // unit
+        if previous is None:
+            coverage.first = timestamp
+        elif timestamp - previous > delta and (timestamp - previous) // delta - 1 >= min_candles:
+            coverage.gaps.append(Gap(start=previous + delta, end=timestamp, delta=delta))
+        if previous is None or timestamp != previous:
+            coverage.count += 1
+        previous = timestamp
+    coverage.last = previous
+    return coverage
+
+
+def windows(gap: Gap, size: int):
+    for start in range(gap.start, gap.end, size * gap.delta):
+        yield (
+            pendulum.from_timestamp(start).replace(tzinfo=None),
+            pendulum.from_timestamp(min(gap.end, start + size * gap.delta)).replace(tzinfo=None),
+        )
+
+
+def create_fetcher(source):
+    # Scraper modules are imported lazily since they pull in their api clients
+    if source == 'bitstamp':
+        from scraping.bitstamp import fetch_window, store_window
+        from scraping.ratelimit import rate_limited_session
+        session = rate_limited_session()
+        return lambda store, output, symbol, step, from_dt, till_dt: store_window(
+            store, output, symbol, step, fetch_window(session, symbol, TIMESTEPS[step], from_dt, till_dt))
+    if source == 'coinmarketcap':
+        from scraping.coinmarketcap import fetch_window
+        from scraping.ratelimit import rate_limited_session
+        session = rate_limited_session()
+        return lambda store, output, symbol, step, from_dt, till_dt: \
+            fetch_window(session, store, output, symbol, step, from_dt, till_dt)
+    if source == 'binance':
+        from scraping.binance import fetch_range, create_client
+        client = create_client()
+        return lambda store, output, symbol, step, from_dt, till_dt: \
+            fetch_range(client, store, output, symbol, step, from_dt, till_dt)
+    raise ValueError(f'Unknown source {source}')
+
+
+def list_symbols(group, source):
+    names = group.database.list_collection_names()
+    return sorted({name.split('.')[1] for name in names if name.startswith(f'{source}.')})
+
+
+@click.command()
+@click.option('--source', type=click.Choice(SOURCES), required=True, help='Market source to scan')
+@click.option('--symbols', multiple=True, default=None, help='Symbols to scan (defaults to all stored symbols)')
+@click.option('--steps', multiple=True, default=list(TIMESTEPS), help='Timeframes to scan')
+@click.option('--min-candles', type=int, default=1, help='Ignore gaps with less missing candles')
+@click.option('--backfill', is_flag=True, default=False, help='Fetch the missing ranges')
+def gaps(source, symbols, steps, min_candles, backfill):
+    group = mongodb()['market'][source]
+    symbols = symbols or list_symbols(group, source)
+    logging.info(f'Scanning {source} candles for gaps. Symbols: {symbols}, Timeframes: {steps}')
+
+    fetch = create_fetcher(source) if backfill else None
+    market = MarketStore()
+    for symbol in symbols:
+        for step in steps:
+            output = group[symbol][step]
+            coverage = scan_gaps(output, TIMESTEPS[step], SCHEMAS[source].unit, min_candles)
+            if coverage.first is None:
+                click.echo(f'{source}/{symbol}/{step}: empty')
+                continue
+
+            click.echo(
+                f'{source}/{symbol}/{step}: {coverage.count}/{coverage.expected} candles ({coverage.ratio:.2%}), '
+                f'{len(coverage.gaps)} gaps, {coverage.missing} missing, '
+                f'{pendulum.from_timestamp(coverage.first).to_date_string()} - '
+                f'{pendulum.from_timestamp(coverage.last).to_date_string()}'
+            )
+            for gap in coverage.gaps:
+                logging.debug(f'- {source}/{symbol}/{step}: {gap}')
+
+            if not fetch:
+                continue
+            # Series which are mirrored in the parquet market store get the repaired ranges as well
+            store = market if market.exists(source, symbol, step) else None
+            fetched = 0
+            for gap in coverage.gaps:
+                for from_dt, till_dt in windows(gap, WINDOW_CANDLES[source]):
+                    try:
+                        fetched += fetch(store, output, symbol, step, from_dt, till_dt)
+                    except Exception as e:
+                        logging.warning(f'Failed backfilling {source}/{symbol}/{step} {from_dt} - {till_dt}: {e}')
+            logging.info(f'Backfilled {source}/{symbol}/{step}: {fetched} candles for {len(coverage.gaps)} gaps')
+
+            if step == BASE_STEP and fetched and coverage.gaps:
+                # Refresh the stored timeframes derived from the backfilled ranges
+                names = group.database.list_collection_names()
+                derived = [s for s in TIMESTEPS if s != BASE_STEP and group[symbol][s].name in names]
+                if derived:
+                    resample_symbol(group, source, symbol, derived, since=coverage.gaps[0].start,
+                                    until=coverage.gaps[-1].end)
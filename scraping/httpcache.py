@@ -0,0 +1,129 @@
+import glob
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from scrapy.extensions.httpcache import FilesystemCacheStorage, RFC2616Policy
+from scrapy.utils.request import RequestFingerprinter
+
+HTTPCACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../data/httpcache'))
+# Auth failures and throttled or failed responses are never cached
+IGNORE_HTTP_CODES = [401, 403, 419, 429, 500, 502, 503, 504]
+# Session bound fields of listing request bodies (csrf tokens) which don't change the response
+VOLATILE_FIELDS = ['token']
+
+
+def cache_settings(max_size, offline=False):
+    return {
+        'HTTPCACHE_ENABLED': True,
+        'HTTPCACHE_DIR': HTTPCACHE_DIR,
+        'HTTPCACHE_STORAGE': f'{LRUFilesystemCacheStorage.__module__}.{LRUFilesystemCacheStorage.__name__}',
+        'HTTPCACHE_MAX_SIZE': max_size,
+        'HTTPCACHE_IGNORE_HTTP_CODES': IGNORE_HTTP_CODES,
+        # Json listings and many articles come without validators or expiry, rfc2616 wouldn't store them at all.
+        # Stored responses are still revalidated by the policy before they are served online
+        'HTTPCACHE_ALWAYS_STORE': True,
+        # Offline every cached response is served as is and uncached requests are dropped
+        'HTTPCACHE_POLICY': 'scrapy.extensions.httpcache.DummyPolicy' if offline
+        else f'{ListingAwarePolicy.__module__}.{ListingAwarePolicy.__name__}',
+        'HTTPCACHE_IGNORE_MISSING': offline,
+        'REQUEST_FINGERPRINTER_CLASS': f'{ListingFingerprinter.__module__}.{ListingFingerprinter.__name__}',
+    }
+
+
+class ListingFingerprinter(RequestFingerprinter):
+    """
+    Default fingerprinter which leaves the `VOLATILE_FIELDS` out of the json body of listing requests. Otherwise
+    search pages posted with a fresh csrf token never match the ones cached under an older token.
+    """
+
+    def fingerprint(self, request):
+        if request.meta.get('listing') and request.body:
+            try:
+                data = json.loads(request.body)
+            except ValueError:
+                data = None
+            if isinstance(data, dict) and any(field in data for field in VOLATILE_FIELDS):
+                data = {key: value for key, value in data.items() if key not in VOLATILE_FIELDS}
+                request = request.replace(body=json.dumps(data, sort_keys=True))
+        return super().fingerprint(request)
+
+
+class ListingAwarePolicy(RFC2616Policy):
+    """
+    RFC2616 policy which revalidates stale articles with their ETag / Last-Modified headers, including the ones
+    marked `no-cache` which scrapy downloads again unconditionally.
+    Requests marked with the `listing` meta key (search pages) change with every new article. They are stored for
+    offline re-parses but never served from the cache without revalidation.
+    """
+
+    def is_cached_response_fresh(self, cachedresponse, request):
+        if not request.meta.get('listing') and super().is_cached_response_fresh(cachedresponse, request):
+            return True
+        self._set_conditional_validators(request, cachedresponse)
+        return False
+
+
+def entry_size(folder):
+    return sum(entry.stat().st_size for entry in os.scandir(folder) if entry.is_file())
+
+
+class LRUFilesystemCacheStorage(FilesystemCacheStorage):
+    """
+    Filesystem cache storage which keeps at most `HTTPCACHE_MAX_SIZE` bytes per spider by evicting the least recently
+    used responses. Recency is tracked through the modification time of the `meta` file of every entry, in memory
+    the entries (folder -> size) are kept in least recently used order.
+    """
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.max_size = settings.getint('HTTPCACHE_MAX_SIZE', 1024 ** 3)
+        self.entries = OrderedDict()
+        self.size = 0
+        self.evicted = 0
+
+    def open_spider(self, spider):
+        super().open_spider(spider)
+        metas = glob.glob(os.path.join(self.cachedir, spider.name, '*', '*', 'meta'))
+        for meta in sorted(metas, key=os.path.getmtime):
+            folder = os.path.dirname(meta)
+            self.entries[folder] = entry_size(folder)
+        self.size = sum(self.entries.values())
+        self._evict()
+        logging.debug(f'Http cache of {spider.name}: {len(self.entries)} responses, {self.size / 1024 ** 2:.1f}MB')
+
+    def close_spider(self, spider):
+        super().close_spider(spider)
+        spider.crawler.stats.set_value('httpcache/evicted', self.evicted)
+        spider.crawler.stats.set_value('httpcache/size', self.size)
+
+    def retrieve_response(self, spider, request):
+        response = super().retrieve_response(spider, request)
+        if response is not None:
+            folder = self._get_request_path(spider, request)
+            now = time.time()
+            # Only `meta` is touched, the expiration is checked against `pickled_meta`
+            os.utime(os.path.join(folder, 'meta'), (now, now))
+            if folder in self.entries:
+                self.entries.move_to_end(folder)
+        return response
+
+    def store_response(self, spider, request, response):
+        super().store_response(spider, request, response)
+        folder = self._get_request_path(spider, request)
+        previous = self.entries.pop(folder, 0)
+        size = entry_size(folder)
+        self.entries[folder] = size
+        self.size += size - previous
+        self._evict()
+
+    def _evict(self):
+        while self.size > self.max_size and self.entries:
+            folder, size = self.entries.popitem(last=False)
+            for entry in os.scandir(folder):
+                os.remove(entry.path)
+            os.rmdir(folder)
+            self.size -= size
+            self.evicted += 1
@@ -0,0 +1,46 @@
+import logging
+import shutil
+
+import click
+import pymongo
+
+from config import mongodb
+from scraping.gaps import list_symbols
+from utils.market import MarketStore
+
+TIMESTEPS = ['5m', '15m', '1h', '4h', '1d']
+BATCH_SIZE = 100000
+
+
+def export_series(collection, store: MarketStore, source, pair, step, batch_size=BATCH_SIZE):
+    shutil.rmtree(store.path(source, pair, step), ignore_errors=True)
+
+    count, batch = 0, []
+    for doc in collection.find({}, {'_id': 0}).sort('timestamp', pymongo.ASCENDING).batch_size(10000):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            count += store.append(source, pair, step, batch)
+            batch = []
+    if batch:
+        count += store.append(source, pair, step, batch)
+
+    store.compact(source, pair, step)
+    return count
+
+
+@click.command(name='market-store')
+@click.option('--source', type=click.Choice(['binance', 'bitstamp', 'coinmarketcap']), required=True)
+@click.option('--symbols', multiple=True, default=None, help='Symbols to export (defaults to all stored symbols)')
+@click.option('--steps', multiple=True, default=TIMESTEPS, help='Timeframes to export')
+def market_store(source, symbols, steps):
+    group = mongodb()['market'][source]
+    symbols = symbols or list_symbols(group, source)
+    logging.info(f'Exporting {source} candles to the market store. Symbols: {symbols}, Timeframes: {steps}')
+
+    store = MarketStore()
+    for symbol in symbols:
+        for step in steps:
+            count = export_series(group[symbol][step], store, source, symbol, step)
+            logging.debug(f'Exported {source}/{symbol}/{step}: {count} candles')
+
+    logging.info(f'Finished exporting {source} candles to {store.root}')
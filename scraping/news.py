@@ -1,18 +1,34 @@
 import logging
+import queue
+import threading
+import time
 from datetime import datetime
 
 import click
 import pymongo
+from scrapy import signals
 from scrapy.crawler import CrawlerProcess
 from scrapy.utils.project import get_project_settings
 
 from config import mongodb
+from scraping.checkpoints import CheckpointStore
+from scraping.httpcache import cache_settings
+from utils.mongo import BulkWriter
 from scraping.spiders.CoindeskSpider import CoindeskSpider
 from scraping.spiders.CointelegraphSpider import CointelegraphSpider
 from scraping.spiders.NewsbtcScrapper import NewsbtcSpider
 
 
 class MongoDBPipeline(object):
+    """
+    Hands scraped items to a background thread which upserts them in bulk batches, so slow writes don't block the
+    crawl. The remaining items are flushed when the spider closes. Failed writes are retried, items which still
+    couldn't be stored mark the spider with `storage_failed`.
+    """
+    BATCH_SIZE = 100
+    FLUSH_INTERVAL = 5.0
+    FLUSH_RETRIES = 5
+
     def __init__(self):
         client = mongodb()
         scrapperdb = client['scrapper']
@@ -24,28 +40,118 @@ class MongoDBPipeline(object):
             ('source', pymongo.ASCENDING),
 
         ])
+        self.writer = BulkWriter(self.collection, batch_size=self.BATCH_SIZE, flush_interval=self.FLUSH_INTERVAL)
+        self.queue = queue.Queue()
+        self.thread = None
+        self.failed = False
+
+    def open_spider(self, spider):
+        self.thread = threading.Thread(target=self._write_loop, name=f'{spider.name}-mongodb', daemon=True)
+        self.thread.start()
+
+    def close_spider(self, spider):
+        self.queue.put(None)
+        self.thread.join()
+        # Checked before the high water mark is moved, items which weren't stored have to be crawled again
+        spider.storage_failed = self.failed or self.writer.errors > 0 or not self.queue.empty()
+        logging.info(f'Stored {spider.name} items: {self.writer.stats()}')
 
     def process_item(self, item, spider):
-        self.collection.update({'_id': item['slug']}, {
+        self.queue.put({
             '_id': item['slug'],
             **item,
-        }, upsert=True)
+        })
         return item
 
+    def _flush(self):
+        try:
+            self.writer.flush()
+            return True
+        except Exception as e:
+            # The batch stays buffered in the writer and is retried with the next flush
+            logging.error(f'Failed storing news items: {e}')
+            return False
+
+    def _write_loop(self):
+        while True:
+            try:
+                doc = self.queue.get(timeout=self.FLUSH_INTERVAL)
+            except queue.Empty:
+                self._flush()
+                continue
+
+            if doc is None:
+                break
+            try:
+                self.writer.add(doc)
+            except Exception as e:
+                logging.error(f'Failed storing news items: {e}')
+
+        for _ in range(self.FLUSH_RETRIES):
+            if self._flush():
+                return
+            time.sleep(self.FLUSH_INTERVAL)
+        self.failed = True
+        logging.error(f'Dropped {len(self.writer.buffer)} news items after {self.FLUSH_RETRIES} failed writes')
+
+
+def track_high_water_mark(crawler, checkpoints: CheckpointStore, query):
+    """
+    Stores the date of the newest scraped item once the crawl finished and its listing was paged through to the
+    previous mark (or the end). Interrupted crawls, crawls whose pagination stopped early (a listing page failed or
+    couldn't be parsed) and crawls with failed articles or items which couldn't all be stored don't move the mark,
+    since older articles between the previous mark and the newest one may not have been scraped yet.
+    """
+    newest, errors = {}, []
+
+    def spider_error(failure, response, spider):
+        # A callback raised, e.g. an article which couldn't be parsed
+        errors.append(response.url)
+
+    def item_scraped(item, spider):
+        if item.get('date') and ('date' not in newest or item['date'] > newest['date']):
+            newest['date'] = item['date']
+
+    def spider_closed(spider, reason):
+        complete = spider.pagination_complete and not spider.pagination_failed and not spider.storage_failed \
+            and not spider.articles_failed and not errors
+        if reason != 'finished' or not complete:
+            logging.warning(f'Not moving {checkpoints.scope} high water mark, the listing was not fully crawled '
+                            f'or stored. Reason: {reason}, Failed articles: {spider.articles_failed}, '
+                            f'Errors: {len(errors)}, Query: {query}')
+        elif 'date' in newest:
+            checkpoints.save_high_water_mark(query, newest['date'])
+            logging.info(f'Moved {checkpoints.scope} high water mark to {newest["date"]}. Query: {query}')
+
+    crawler.signals.connect(spider_error, signal=signals.spider_error, weak=False)
+    crawler.signals.connect(item_scraped, signal=signals.item_scraped, weak=False)
+    crawler.signals.connect(spider_closed, signal=signals.spider_closed, weak=False)
+
 
 @click.command()
 @click.option('--query_coindesk', default='bitcoin', help='Query to fetch data from', required=True)
 @click.option('--query_telegraph', default='bitcoin', help='Query to fetch data from', required=True)
 @click.option('--category_newsbtc', default=0, type=int, help='Query to fetch data from', required=True)
-def news(query_coindesk, query_telegraph, category_newsbtc):
+@click.option('--concurrency', default=16, type=int, help='Number of concurrent requests')
+@click.option('--full', is_flag=True, default=False, help='Re-crawl everything instead of stopping at the last crawl')
+@click.option('--cache/--no-cache', default=True, help='Cache responses on disk and revalidate them')
+@click.option('--cache-size', default=2048, type=int, help='Maximum size of the response cache per site in MB')
+@click.option('--offline', is_flag=True, default=False, help='Only serve responses from the cache (e.g. to re-parse)')
+def news(query_coindesk, query_telegraph, category_newsbtc, concurrency, full, cache, cache_size, offline):
+    # Re-parsing from the cache should see every cached article
+    full = full or offline
     logging.info(f'Starting news scrapers: Query: {query_coindesk}|{query_telegraph}|{category_newsbtc}')
 
     settings = get_project_settings()
-    settings.set('CONCURRENT_REQUESTS', 1)
+    settings.set('CONCURRENT_REQUESTS', concurrency)
+    settings.set('CONCURRENT_REQUESTS_PER_DOMAIN', max(1, concurrency // 2))
     settings.set('TELNETCONSOLE_ENABLED', False)
     settings.set('ITEM_PIPELINES', {".".join([MongoDBPipeline.__module__, MongoDBPipeline.__name__]): 300})
+    if cache or offline:
+        settings.setdict(cache_settings(cache_size * 1024 ** 2, offline))
     process = CrawlerProcess(settings)
-    collection = mongodb()['scrapper']['news']
+    scrapperdb = mongodb()['scrapper']
+    collection = scrapperdb['news']
 
     longago = datetime.fromisoformat('2015-01-01T00:00:00')
 
@@ -53,25 +159,22 @@ def news(query_coindesk, query_telegraph, category_newsbtc):
         item = next(collection.find({'source': source}).sort("date", pymongo.DESCENDING).limit(1), None)
         return item['date'] if item else None
 
-    latest = None #last_date(CoindeskSpider.SOURCE)
-    process.crawl(
-        CoindeskSpider,
-        query=query_coindesk,
-        from_date=latest if latest else longago
-    )
-
-    latest = last_date(NewsbtcSpider.SOURCE)
-    process.crawl(
-        NewsbtcSpider,
-        query=category_newsbtc,
-        from_date=latest if latest else longago
-    )
-
-    latest = None # last_date(CointelegraphSpider.SOURCE)
-    process.crawl(
-        CointelegraphSpider,
-        query=query_telegraph,
-        from_date=latest if latest else longago
-    )
+    def crawl(spider_cls, query, fallback=None):
+        checkpoints = CheckpointStore(scrapperdb, f'news.{spider_cls.SOURCE}')
+        latest = None if full else checkpoints.high_water_mark(str(query)) or fallback
+        logging.info(f'Crawling {spider_cls.SOURCE} from {latest or longago}. Query: {query}')
+
+        crawler = process.create_crawler(spider_cls)
+        track_high_water_mark(crawler, checkpoints, str(query))
+        process.crawl(
+            crawler,
+            query=query,
+            from_date=latest if latest else longago
+        )
+
+    crawl(CoindeskSpider, query_coindesk)
+    # Newsbtc category crawls were already incremental on the stored articles before the marks were introduced
+    crawl(NewsbtcSpider, category_newsbtc, None if full else last_date(NewsbtcSpider.SOURCE))
+    crawl(CointelegraphSpider, query_telegraph)
 
     process.start()
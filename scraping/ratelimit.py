@@ -0,0 +1,150 @@
+import email.utils
+import logging
+import threading
+import time
+import urllib.parse as u
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Requests per second which are allowed per host
+HOST_RATES = {
+    'www.bitstamp.net': 10,  # 8000 requests per 10 minutes
+    'web-api.coinmarketcap.com': 1,
+    'api.binance.com': 3,  # 1200 weight per minute, a 1000 kline request weighs 5
+    'api.twitter.com': 5,
+}
+DEFAULT_RATE = 1
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Token bucket which refills at `rate` tokens per second up to `capacity`.
+    The rate is halved on throttling responses and recovers additively on successful ones (AIMD).
+    """
+
+    def __init__(self, rate, capacity=None, min_rate=None, recovery=0.05):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate or rate / 16
+        self.recovery = recovery
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def throttle(self, delay):
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+            self.tokens = 0
+
+    def succeed(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * self.recovery)
+
+
+class RateLimiter:
+    def __init__(self, rates=None, default_rate=DEFAULT_RATE, backoff=1.0, max_backoff=300.0):
+        self.rates = {**HOST_RATES, **(rates or {})}
+        self.default_rate = default_rate
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.buckets = {}
+        self.failures = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, host) -> TokenBucket:
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rates.get(host, self.default_rate))
+            return self.buckets[host]
+
+    def set_rate(self, host, rate):
+        with self.lock:
+            self.rates[host] = rate
+            self.buckets.pop(host, None)
+
+    def acquire(self, url):
+        self.bucket(u.urlparse(url).netloc).acquire()
+
+    def feedback(self, url, response):
+        host = u.urlparse(url).netloc
+        bucket = self.bucket(host)
+        if response.status_code not in RETRY_STATUSES:
+            with self.lock:
+                self.failures[host] = 0
+            bucket.succeed()
+            return None
+
+        with self.lock:
+            self.failures[host] = failures = self.failures.get(host, 0) + 1
+
+        # Exponential backoff unless the server tells us how long to wait
+        delay = parse_retry_after(response.headers.get('Retry-After'))
+        if delay is None:
+            delay = min(self.max_backoff, self.backoff * 2 ** (failures - 1))
+        logging.debug(f'Throttling {host} for {delay:.1f}s after status {response.status_code}')
+        bucket.throttle(delay)
+        return delay
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """
+    Transport adapter which waits for the host's token bucket before every request and retries throttled ones.
+    """
+
+    def __init__(self, limiter: RateLimiter, retries=5, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter
+        self.retries = retries
+
+    def send(self, request, **kwargs):
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire(request.url)
+            response = super().send(request, **kwargs)
+            if self.limiter.feedback(request.url, response) is None or attempt == self.retries:
+                return response
+            response.close()
+
+
+limiter = RateLimiter()
+
+
+def rate_limited_session(retries=5, rate_limiter=None, **kwargs) -> requests.Session:
+    session = requests.Session()
+    adapter = RateLimitedAdapter(rate_limiter or limiter, retries=retries, **kwargs)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
@@ -0,0 +1,163 @@
+import datetime as dt
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict
+
+import click
+import pandas as pd
+import pymongo
+
+from config import mongodb
+from utils.mongo import BulkWriter
+
+BASE_STEP = '5m'
+TIMESTEPS = {
+    '5m': 300,
+    '15m': 900,
+    '1h': 3600,
+    '4h': 14400,
+    '1d': 86400
+}
+
+# Number of target candles which are computed per database query
+CHUNK_CANDLES = 1000
+
+
+@dataclass
+class Schema:
+    # Timestamp units per second
+    unit: int
+    # Aggregation per field
+    fields: Dict[str, str]
+    # Converts a number back to the representation the source stores
+    encode: Callable = float
+    # Field specific representations
+    types: Dict[str, Callable] = field(default_factory=dict)
+
+    def encode_field(self, name, value):
+        return self.types.get(name, self.encode)(value)
+
+
+SCHEMAS = {
+    'binance': Schema(unit=1000, encode=str, fields={
+        'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum',
+        'close_time': 'last', 'quote_av': 'sum', 'trades': 'sum', 'tb_base_av': 'sum', 'tb_quote_av': 'sum',
+    }, types={'close_time': int, 'trades': int}),
+    'bitstamp': Schema(unit=1, encode=str, fields={
+        'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum',
+    }),
+    'coinmarketcap': Schema(unit=1, fields={
+        'close': 'last', 'volume_24hr': 'last', 'market_cap': 'last',
+    }),
+}
+
+
+def encode_timestamp(value: int, like):
+    return str(value) if isinstance(like, str) else value
+
+
+def aggregate(df: pd.DataFrame, schema: Schema, delta: int) -> pd.DataFrame:
+    fields = {k: v for k, v in schema.fields.items() if k in df.columns}
+    df = df.astype({k: float for k in fields})
+    df['timestamp'] = df['timestamp'].astype('int64')
+    # first / last depend on the row order and candles aren't stored in order (parallel windows, gap backfills)
+    df = df.sort_values('timestamp', kind='stable')
+    df['bucket'] = df['timestamp'] // (delta * schema.unit) * (delta * schema.unit)
+    return df.groupby('bucket', sort=True).agg(fields).reset_index()
+
+
+def bucket_floor(value: int, delta: int, schema: Schema) -> int:
+    return value // (delta * schema.unit) * (delta * schema.unit)
+
+
+def resample_series(source, target, schema: Schema, delta: int, since=None, until=None, writer_size=1000) -> int:
+    """
+    Rebuilds the `target` candles from the finer `source` candles. Buckets from the last stored target bucket onward
+    are recomputed, together with the buckets touched by source candles which were written below it (gap backfills).
+    :param since: unix seconds of the earliest source candle written since the last resample
+    :param until: unix seconds after the last source candle of that range (defaults to the end of the series)
+    """
+    target.ensure_index([('timestamp', pymongo.ASCENDING)])
+    first = next(source.find({}, {'timestamp': 1}).sort('timestamp', pymongo.ASCENDING).limit(1), None)
+    if not first:
+        return 0
+
+    like = first['timestamp']
+    last = next(target.find({}, {'timestamp': 1}).sort('timestamp', pymongo.DESCENDING).limit(1), None)
+    if not last:
+        ranges = [(bucket_floor(int(like), delta, schema), None)]
+    else:
+        ranges = [(int(last['timestamp']), None)]
+        if since is not None and bucket_floor(since * schema.unit, delta, schema) < ranges[0][0]:
+            lo = bucket_floor(since * schema.unit, delta, schema)
+            # The touched range ends after the bucket of its last candle, it is merged with the tail if they overlap
+            hi = None if until is None else bucket_floor(until * schema.unit - 1, delta, schema) + delta * schema.unit
+            ranges = [(lo, None)] if hi is None or hi >= ranges[0][0] else [(lo, hi), *ranges]
+
+    count = 0
+    with BulkWriter(target, batch_size=writer_size) as writer:
+        for lo, end in ranges:
+            count += resample_range(source, writer, schema, delta, like, lo, end)
+    return count
+
+
+def resample_range(source, writer, schema: Schema, delta: int, like, lo: int, end=None) -> int:
+    span = delta * schema.unit * CHUNK_CANDLES
+    projection = {'_id': 0, 'timestamp': 1, **{k: 1 for k in schema.fields}}
+
+    count = 0
+    while end is None or lo < end:
+        # Skip ranges without any source candles
+        head = next(source.find({'timestamp': {'$gte': encode_timestamp(lo, like)}}, {'timestamp': 1})
+                    .sort('timestamp', pymongo.ASCENDING).limit(1), None)
+        if not head:
+            break
+        lo = max(lo, bucket_floor(int(head['timestamp']), delta, schema))
+        hi = lo + span if end is None else min(lo + span, end)
+        if lo >= hi:
+            break
+
+        df = pd.DataFrame(list(source.find({'timestamp': {
+            '$gte': encode_timestamp(lo, like),
+            '$lt': encode_timestamp(hi, like),
+        }}, projection)))
+        if len(df) > 0:
+            candles = aggregate(df, schema, delta)
+            for row in candles.to_dict('records'):
+                timestamp = encode_timestamp(int(row.pop('bucket')), like)
+                writer.add({
+                    '_id': timestamp,
+                    'timestamp': timestamp,
+                    **{k: schema.encode_field(k, v) for k, v in row.items()},
+                })
+            count += len(candles)
+        lo = hi
+    return count
+
+
+def resample_symbol(group, source: str, symbol: str, steps=None, since=None, until=None):
+    """
+    Derives the `steps` timeframes of a symbol from its base candles. Pass the range of base candles which were
+    written out of order (`since` / `until` in unix seconds) so the buckets they touch are recomputed as well.
+    """
+    schema = SCHEMAS[source]
+    for step in steps or [s for s in TIMESTEPS if s != BASE_STEP]:
+        count = resample_series(group[symbol][BASE_STEP], group[symbol][step], schema, TIMESTEPS[step], since, until)
+        logging.debug(f'Resampled {source}/{symbol}/{step}: {count} candles')
+
+
+@click.command()
+@click.option('--source', type=click.Choice(list(SCHEMAS)), required=True, help='Market source to resample')
+@click.option('--symbols', required=True, multiple=True, help='Symbols to resample')
+@click.option('--steps', multiple=True, default=None, help='Timeframes to derive from the 5m candles')
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Also recompute the candles from this (utc) date, e.g. after 5m candles were written below them')
+def resample(source, symbols, steps, since):
+    logging.info(f'Resampling {source} candles. Symbols: {symbols}, Timeframes: {steps or "all"}')
+
+    group = mongodb()['market'][source]
+    since = int(since.replace(tzinfo=dt.timezone.utc).timestamp()) if since else None
+    for symbol in symbols:
+        resample_symbol(group, source, symbol, steps, since=since)
+
+    logging.info(f'Finished resampling {source} candles. Symbols: {symbols}')
@@ -1,16 +1,18 @@
 import logging
 from typing import Optional
+from urllib.parse import urlencode
 
-import requests
 import scrapy
 from datetime import datetime
 from scrapy import signals
 
+from scraping.spiders import ListingSpider
+
 SEARCH_URL = 'https://www.coindesk.com/wp-json/v1/search'
 HEADERS = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64; rv:48.0) Gecko/20100101 Firefox/48.0'}
 
 
-class CoindeskSpider(scrapy.Spider):
+class CoindeskSpider(ListingSpider):
     name = 'CoindeskSpider'
     query = ''
     from_date: Optional[datetime] = None
@@ -22,27 +24,41 @@ class CoindeskSpider(scrapy.Spider):
         crawler.signals.connect(spider.spider_closed, signal=signals.spider_closed)
         return spider
 
+    def search_request(self, page):
+        return scrapy.Request(
+            f'{SEARCH_URL}?{urlencode({"keyword": self.query, "page": page})}',
+            callback=self.parse_search,
+            errback=self.listing_failed,
+            cb_kwargs={'page': page},
+            meta={'listing': True},
+            dont_filter=True,
+            headers=HEADERS
+        )
+
     def start_requests(self):
-        for page in range(100000):
-            data = requests.get(SEARCH_URL, {
-                'keyword': self.query,
-                'page': page
-            }).json()
+        yield self.search_request(0)
+
+    def parse_search(self, response, page):
+        data = response.json()
+        if len(data) == 0 or not data.get('results'):
+            self.listing_end()
+            return
 
-            if len(data) == 0:
-                break
+        for item in data['results']:
+            date = datetime.fromisoformat(item['date'])
+            if self.from_date and self.from_date >= date:
+                self.listing_end()
+                return
 
-            for item in data['results']:
-                date = datetime.fromisoformat(item['date'])
-                if self.from_date and self.from_date >= date:
-                    return
+            yield scrapy.Request(
+                item['url'],
+                errback=self.article_failed,
+                cb_kwargs={'item': item},
+                dont_filter=True,
+                headers=HEADERS
+            )
 
-                yield scrapy.Request(
-                    item['url'],
-                    cb_kwargs={'item': item},
-                    dont_filter=True,
-                    headers=HEADERS
-                )
+        yield self.search_request(page + 1)
 
     def parse(self, response, **kwargs):
         meta = kwargs['item']
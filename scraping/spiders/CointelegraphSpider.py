@@ -1,23 +1,32 @@
 import logging
+import time
 from typing import Optional
+from urllib.parse import urlencode
 
-import requests
 import scrapy
 from datetime import datetime
 
 from scrapy import signals
-from scrapy.http import HtmlResponse
+from scrapy.http import JsonRequest
+
+from scraping.spiders import ListingSpider
 
 SEARCH_URL = 'https://cointelegraph.com/api/v1/content/search/result'
 SEARCH_URL2 = 'https://cointelegraph.com/search'
+# Seconds a csrf token is reused for before the search page is fetched again
+CSRF_TTL = 30 * 60
+# Statuses the search endpoint responds with when the csrf token is rejected
+AUTH_STATUSES = [401, 403, 419]
 HEADERS = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64; rv:48.0) Gecko/20100101 Firefox/48.0'}
 
 
-class CointelegraphSpider(scrapy.Spider):
+class CointelegraphSpider(ListingSpider):
     name = 'CointelegraphSpider'
     query = ''
     from_date: Optional[datetime] = None
     SOURCE = 'cointelegraph'
+    csrf_token: Optional[str] = None
+    csrf_fetched_at = 0.0
 
     @classmethod
     def from_crawler(cls, crawler, *args, **kwargs):
@@ -25,41 +34,84 @@ class CointelegraphSpider(scrapy.Spider):
         crawler.signals.connect(spider.spider_closed, signal=signals.spider_closed)
         return spider
 
-    def retrieve_csrf(self):
-        preimage = requests.get(SEARCH_URL2, {
-            'query': self.query
-        }, headers=HEADERS)
-        preimage_respose = HtmlResponse(url=SEARCH_URL2, body=preimage.content, encoding='utf-8')
-        csrf_token = preimage_respose.xpath("//meta[@name='csrf-token']/@content")[0].extract()
-        return csrf_token
-
-    def start_requests(self):
-        for page in range(100000):
-            csrf_token = self.retrieve_csrf()
-
-            data = requests.post(SEARCH_URL, json={
+    def csrf_request(self, page, retry=False):
+        # The search api requires the csrf token of the search page
+        return scrapy.Request(
+            f'{SEARCH_URL2}?{urlencode({"query": self.query})}',
+            callback=self.parse_csrf,
+            errback=self.listing_failed,
+            cb_kwargs={'page': page, 'retry': retry},
+            meta={'listing': True},
+            dont_filter=True,
+            headers=HEADERS
+        )
+
+    def search_request(self, page, csrf_token, retry=False):
+        return JsonRequest(
+            SEARCH_URL,
+            data={
                 'query': self.query,
                 'page': page,
                 'token': csrf_token,
-            }, headers=HEADERS).json()
+            },
+            callback=self.parse_search,
+            errback=self.listing_failed,
+            cb_kwargs={'page': page, 'retry': retry},
+            meta={'listing': True, 'handle_httpstatus_list': AUTH_STATUSES},
+            dont_filter=True,
+            headers=HEADERS
+        )
+
+    def page_request(self, page):
+        # Reuse the cached token until it expires instead of downloading the search page for every result page
+        if self.csrf_token and time.monotonic() - self.csrf_fetched_at < CSRF_TTL:
+            self.crawler.stats.inc_value('cointelegraph/csrf_fetches_avoided')
+            return self.search_request(page, self.csrf_token)
+        return self.csrf_request(page)
 
-            if len(data) == 0:
-                break
-
-            for item in data['posts']:
-                if not item:
-                    continue
-
-                date = datetime.fromisoformat(item['publishedW3']).replace(tzinfo=None)
-                if self.from_date and self.from_date >= date:
-                    return
-
-                yield scrapy.Request(
-                    item['url'],
-                    cb_kwargs={'item': item},
-                    dont_filter=True,
-                    headers=HEADERS
-                )
+    def start_requests(self):
+        yield self.page_request(0)
+
+    def parse_csrf(self, response, page, retry):
+        self.csrf_token = response.xpath("//meta[@name='csrf-token']/@content")[0].extract()
+        self.csrf_fetched_at = time.monotonic()
+        self.crawler.stats.inc_value('cointelegraph/csrf_fetches')
+        yield self.search_request(page, self.csrf_token, retry)
+
+    def parse_search(self, response, page, retry):
+        if response.status in AUTH_STATUSES:
+            # The token was rejected, refresh it once for this page
+            if retry:
+                logging.error(f'Cointelegraph search rejected a fresh csrf token. Page: {page} Query: {self.query}')
+                self.pagination_failed = True
+                return
+            self.csrf_token = None
+            yield self.csrf_request(page, retry=True)
+            return
+
+        data = response.json()
+        if len(data) == 0 or not data.get('posts'):
+            self.listing_end()
+            return
+
+        for item in data['posts']:
+            if not item:
+                continue
+
+            date = datetime.fromisoformat(item['publishedW3']).replace(tzinfo=None)
+            if self.from_date and self.from_date >= date:
+                self.listing_end()
+                return
+
+            yield scrapy.Request(
+                item['url'],
+                errback=self.article_failed,
+                cb_kwargs={'item': item},
+                dont_filter=True,
+                headers=HEADERS
+            )
+
+        yield self.page_request(page + 1)
 
     def parse(self, response, **kwargs):
         meta = kwargs['item']
@@ -86,4 +138,7 @@ class CointelegraphSpider(scrapy.Spider):
     def spider_closed(self, spider):
         stats = spider.crawler.stats.get_stats()
         numcount = str(stats.get('item_scraped_count', 0))
-        logging.info(f'Finished scraping CoinTelegraph. Results: {numcount} Query: {self.query}')
+        fetches = stats.get('cointelegraph/csrf_fetches', 0)
+        avoided = stats.get('cointelegraph/csrf_fetches_avoided', 0)
+        logging.info(f'Finished scraping CoinTelegraph. Results: {numcount} Query: {self.query} '
+                     f'Csrf token fetches: {fetches} (avoided: {avoided})')
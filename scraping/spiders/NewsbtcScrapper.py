@@ -2,16 +2,17 @@ import logging
 from datetime import datetime
 from typing import Optional
 
-import requests
 import scrapy
 from scrapy import signals
 from scrapy.http import HtmlResponse
 
+from scraping.spiders import ListingSpider
+
 SEARCH_URL = 'https://www.newsbtc.com/'
 HEADERS = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64; rv:48.0) Gecko/20100101 Firefox/48.0'}
 
 
-class NewsbtcSpider(scrapy.Spider):
+class NewsbtcSpider(ListingSpider):
     name = 'NewsbtcSpider'
     query = 0
     from_date: Optional[datetime] = None
@@ -23,39 +24,56 @@ class NewsbtcSpider(scrapy.Spider):
         crawler.signals.connect(spider.spider_closed, signal=signals.spider_closed)
         return spider
 
-    def start_requests(self):
-        for page in range(100000):
-            data = requests.post(SEARCH_URL, params={
-                'ajax-request': 'jnews'
-            }, data={
+    def search_request(self, page):
+        return scrapy.FormRequest(
+            f'{SEARCH_URL}?ajax-request=jnews',
+            formdata={
                 'lang': 'en',
                 'action': 'jnews_module_ajax_jnews_block_3',
-                'data[attribute][number_post]': 100,
-                'data[current_page]': page,
+                'data[attribute][number_post]': '100',
+                'data[current_page]': str(page),
                 'data[attribute][post_type]': 'post',
                 'data[attribute][sort_by]': 'latest',
-                'data[attribute][include_category]': self.query,
-            }, headers=HEADERS).json()
+                'data[attribute][include_category]': str(self.query),
+            },
+            callback=self.parse_search,
+            errback=self.listing_failed,
+            cb_kwargs={'page': page},
+            meta={'listing': True},
+            dont_filter=True,
+            headers=HEADERS
+        )
+
+    def start_requests(self):
+        yield self.search_request(0)
+
+    def parse_search(self, response, page):
+        data = response.json()
+        listing = HtmlResponse(url=SEARCH_URL, body=data['content'], encoding='utf-8')
+        articles = list(listing.css('article'))
 
-            response = HtmlResponse(url=SEARCH_URL, body=data['content'], encoding='utf-8')
-            articles = list(response.css('article'))
+        if len(articles) == 0:
+            self.listing_end()
+            return
 
-            if len(articles) == 0:
-                break
+        for item in articles:
+            url = item.css('.jeg_post_title a').attrib['href']
+            date = datetime.strptime(item.css('.jeg_meta_date a::text').get().strip(), '%B %d, %Y')
 
-            for item in articles:
-                url = item.css('.jeg_post_title a').attrib['href']
-                date = datetime.strptime(item.css('.jeg_meta_date a::text').get().strip(), '%B %d, %Y')
+            # Listing dates have no time, so articles of the day of `from_date` are scraped again
+            if self.from_date and self.from_date > date:
+                self.listing_end()
+                return
 
-                if self.from_date and self.from_date >= date:
-                    return
+            yield scrapy.Request(
+                url,
+                errback=self.article_failed,
+                cb_kwargs={'item': item},
+                dont_filter=True,
+                headers=HEADERS
+            )
 
-                yield scrapy.Request(
-                    url,
-                    cb_kwargs={'item': item},
-                    dont_filter=True,
-                    headers=HEADERS
-                )
+        yield self.search_request(page + 1)
 
     def parse(self, response, **kwargs):
         item = kwargs['item']
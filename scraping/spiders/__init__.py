@@ -0,0 +1,29 @@
+import logging
+
+import scrapy
+
+
+class ListingSpider(scrapy.Spider):
+    """
+    Spider which pages through a newest first listing until `from_date`. Tracks whether the pagination reached its
+    end and whether any article failed, incremental crawls only move their high water mark past a listing which was
+    fully crawled.
+    """
+    pagination_complete = False
+    pagination_failed = False
+    articles_failed = 0
+    # Set by the mongodb pipeline when scraped items couldn't be stored
+    storage_failed = False
+
+    def listing_end(self):
+        self.pagination_complete = True
+
+    def listing_failed(self, failure):
+        # Errback of the listing requests, pagination stops at a failed page
+        self.pagination_failed = True
+        logging.error(f'Failed fetching {self.name} listing page {failure.request.url}: {failure.value}')
+
+    def article_failed(self, failure):
+        # Errback of the article requests, the article is missing from the crawl
+        self.articles_failed += 1
+        logging.error(f'Failed fetching {self.name} article {failure.request.url}: {failure.value}')
@@ -0,0 +1,177 @@
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+
+import requests
+
+from scraping.ratelimit import rate_limited_session
+
+
+@dataclass
+class GuestToken:
+    id: int
+    headers: dict
+    session: requests.Session
+    created_at: float = field(default_factory=time.monotonic)
+    requests: int = 0
+    rate_limited: int = 0
+    rejected: int = 0
+    retired: bool = False
+
+
+# Guest tokens which expired or were revoked are rejected with these statuses
+REJECTED_STATUSES = [401, 403]
+
+
+class TokenSourceError(Exception):
+    """
+    Raised by `GuestTokenPool.acquire` once the token source failed `max_failures` times in a row.
+    """
+
+
+class GuestTokenPool:
+    """
+    Keeps `size` guest tokens (each with its own cookie jar) warm and hands them out round-robin.
+    Tokens are retired after `max_requests` requests, on a 429 response, when they are rejected (401/403) or after
+    `max_age` seconds. A background thread fetches replacements before the active tokens run out, so requests never
+    wait on the token source unless the whole pool is exhausted. After `max_failures` failed fetches in a row the pool
+    gives up, and requests which find no active token raise a `TokenSourceError` instead of waiting forever.
+    """
+
+    def __init__(self, fetch_fn, size=4, max_requests=100, max_age=60 * 60, prefetch=0.75, max_failures=5):
+        self.fetch_fn = fetch_fn
+        self.size = size
+        self.max_requests = max_requests
+        self.max_age = max_age
+        self.prefetch = prefetch
+        self.max_failures = max_failures
+
+        self.tokens = []
+        self.ids = itertools.count()
+        self.position = 0
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+
+        self.fetched = 0
+        self.retired_rate_limited = 0
+        self.retired_rejected = 0
+        self.failures = 0
+        self.error = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._refresh_loop, name='guest-token-pool', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def acquire(self, timeout=None) -> GuestToken:
+        with self.condition:
+            while True:
+                active = [token for token in self.tokens if not token.retired]
+                if active:
+                    token = active[self.position % len(active)]
+                    self.position += 1
+                    token.requests += 1
+                    if token.requests >= self.max_requests:
+                        self._retire(token)
+                    return token
+
+                if self.error is not None:
+                    raise TokenSourceError(f'Failed fetching guest tokens {self.failures} times: {self.error}')
+                if not self.running:
+                    raise RuntimeError('Guest token pool is not running')
+                if not self.condition.wait(timeout):
+                    raise TimeoutError('Timed out waiting for a guest token')
+
+    def report(self, token: GuestToken, status_code: int):
+        if status_code != 429 and status_code not in REJECTED_STATUSES:
+            return
+        with self.condition:
+            if status_code == 429:
+                token.rate_limited += 1
+            else:
+                token.rejected += 1
+            if not token.retired:
+                if status_code == 429:
+                    self.retired_rate_limited += 1
+                else:
+                    self.retired_rejected += 1
+                self._retire(token)
+
+    def stats(self):
+        with self.condition:
+            return {
+                'fetched': self.fetched,
+                'rate_limited': self.retired_rate_limited,
+                'rejected': self.retired_rejected,
+                'tokens': [
+                    {'id': t.id, 'requests': t.requests, 'rate_limited': t.rate_limited, 'rejected': t.rejected,
+                     'retired': t.retired}
+                    for t in self.tokens
+                ],
+            }
+
+    def _retire(self, token):
+        token.retired = True
+        self.tokens.remove(token)
+        self.condition.notify_all()
+
+    def _fresh_count(self):
+        now = time.monotonic()
+        for token in list(self.tokens):
+            if now - token.created_at >= self.max_age:
+                self._retire(token)
+        return sum(
+            1 for token in self.tokens
+            if token.requests < self.max_requests * self.prefetch
+            and now - token.created_at < self.max_age * self.prefetch
+        )
+
+    def _refresh_loop(self):
+        while True:
+            with self.condition:
+                while self.running and self._fresh_count() >= self.size:
+                    self.condition.wait(1)
+                if not self.running:
+                    return
+
+            try:
+                headers, cookies = self.fetch_fn()
+            except Exception as e:
+                logging.warning(f'Failed fetching guest token: {e}')
+                with self.condition:
+                    self.failures += 1
+                    if self.failures >= self.max_failures:
+                        # Wake up the waiting requests, they fail instead of waiting on a source which is down
+                        self.error = e
+                        self.condition.notify_all()
+                        return
+                time.sleep(5)
+                continue
+
+            # Throttled requests are not retried, a rate limited token is retired instead
+            session = rate_limited_session(retries=0)
+            for name, value in cookies.items():
+                session.cookies.set(name, value)
+
+            with self.condition:
+                self.tokens.append(GuestToken(id=next(self.ids), headers=headers, session=session))
+                self.fetched += 1
+                self.failures = 0
+                self.condition.notify_all()
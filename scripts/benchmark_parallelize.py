@@ -0,0 +1,67 @@
+import re
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+import psutil
+
+# %%
+
+from utils.datasets import df_parallelize_run, close_pool
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+RUNS = 3
+
+WORDS = ['bitcoin', 'btc', 'to', 'the', 'moon', 'hodl', '#crypto', '@elonmusk', 'https://t.co/abc', 'buy', 'dip', '$']
+
+
+def legacy_parallelize_run(df, func):
+    # df_parallelize_run before the persistent pool: a new pool and 16 pickled partitions per call
+    num_partitions, num_cores = 16, psutil.cpu_count()
+    # np.array_split(df, num_partitions) on pandas versions which still split frames
+    df_split = [df.iloc[idx] for idx in np.array_split(np.arange(len(df)), num_partitions)]
+    pool = Pool(num_cores)
+    df = pd.concat(pool.map(func, df_split))
+    pool.close()
+    pool.join()
+    return df
+
+
+def clean(df):
+    df = df.copy()
+    df['text'] = df['text'].map(lambda x: re.sub(r'https?://\S+', '@URL', x.lower()))
+    return df
+
+
+def tweets(rows):
+    rng = np.random.RandomState(42)
+    words = np.array(WORDS)[rng.randint(0, len(WORDS), (rows, 16))]
+    return pd.DataFrame({
+        '_id': np.arange(rows, dtype=np.int64),
+        'text': [' '.join(w) for w in words],
+        'user_id': rng.randint(0, 100000, rows).astype(str),
+    })
+
+
+def bench(name, fn, df, expected=None):
+    timings = []
+    for _ in range(RUNS):
+        start = time.time()
+        result = fn(df, clean)
+        timings.append(time.time() - start)
+    if expected is not None:
+        pd.testing.assert_frame_equal(result, expected)
+    print(f'{name}: first {timings[0]:.2f}s, best {min(timings):.2f}s ({len(df) / min(timings):.0f} rows/s)')
+    return result
+
+
+# %%
+
+if __name__ == '__main__':
+    df = tweets(ROWS)
+    print(f'{ROWS} tweets, {psutil.cpu_count()} cores')
+    expected = bench('legacy', legacy_parallelize_run, df)
+    bench('shared memory', df_parallelize_run, df, expected)
+    close_pool()
@@ -10,6 +10,7 @@ import numpy as np
 
 # %%
 from utils.datasets import ensure_dataset
+from utils.market import MarketStore
 
 HOUR = 3600
 DAY = HOUR * 24
@@ -34,10 +35,24 @@ OUTPUT_PATH = '../data/bitcoin_twitter_test_labeled/'
 
 client = mongodb()
 collection = client['market']['coinmarketcap']
+store = MarketStore()
+
+
+def load_market(currency):
+    # Prefer the parquet market store, fall back to the mongo collection
+    if store.exists('coinmarketcap', currency, '1h'):
+        return store.read('coinmarketcap', currency, '1h', columns=['close'])
+    query = collection[currency]['1h'] \
+        .find({}, {'_id': 0, 'timestamp': 1, 'close': 1}) \
+        .sort([('timestamp', pymongo.ASCENDING)])
+    return pd.DataFrame(list(query))
+
+
+markets = {CURRENCY: load_market(CURRENCY) for CURRENCY in CURRENCIES}
 
 # %%
 ensure_dataset(OUTPUT_PATH, delete=True)
-files = pathlib.Path("../data/bitcoin_twitter_test_processed/").glob("part_*.parquet")
+files = pathlib.Path("../data/bitcoin_twitter_test_processed/").glob("**/part_*.parquet")
 for chunk, file in enumerate(files):
     data = pd.read_parquet(file)
     datasets = [data[['_id', 'text', 'follower_count', 'retweet_count', 'created_at']]]
@@ -45,10 +60,7 @@ for chunk, file in enumerate(files):
     for CURRENCY in CURRENCIES:
         # Retrieve collection for given currency
         print(f'Processing: chunk:{chunk}, currency:{CURRENCY}')
-        query = collection[CURRENCY]['1h'] \
-            .find({}, {'_id': 0, 'timestamp': 1, 'close': 1}) \
-            .sort([('timestamp', pymongo.ASCENDING)])
-        market = pd.DataFrame(list(query))
+        market = markets[CURRENCY]
         # Find it's min and max tracked date
         max_date = pendulum.from_timestamp(market.iloc[-1].timestamp)
         min_date = pendulum.from_timestamp(market.iloc[0].timestamp)
@@ -0,0 +1,34 @@
+import numpy as np
+
+# %%
+
+from config import mongodb
+from utils.datasets import parallel_batched_dataset
+
+TOPICS = [
+    'bitcoin', 'btc', 'cryptocurrency', 'altcoins',
+    'airdrop', 'binance'
+]
+BATCH_SIZE = 10000
+DATASET_SIZE = BATCH_SIZE * 30
+SHARDS = 8
+OUTPUT_PATH = '../data/bitcoin_twitter_raw'
+
+
+def callback(df):
+    df['_id'] = df['_id'].astype(np.int64)
+    df['user_id'] = df['user_id'].astype(str)
+    return df
+
+
+# %%
+
+if __name__ == '__main__':
+    collection = mongodb()['scrapper']['tweets']
+    parallel_batched_dataset(
+        collection, OUTPUT_PATH, DATASET_SIZE, BATCH_SIZE,
+        shards=SHARDS,
+        query={'topics': {'$in': TOPICS}},
+        callback=callback,
+        drop_duplicates=True,
+    )
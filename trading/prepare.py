@@ -9,6 +9,7 @@ from pandarallel import pandarallel
 
 from config import mongodb
 from utils.datasets import ensure_dataset, DATASET_DIR
+from utils.market import MarketStore
 
 pandarallel.initialize()
 
@@ -28,7 +29,8 @@ def binance_transform(df: pd.DataFrame):
 
 
 @click.command()
-def prepare():
+@click.option('--store', type=click.Choice(['mongo', 'parquet']), default='mongo', help='Where to load the candles from')
+def prepare(store):
     TIMESCALES = ['5m', '1h']
     DATASETS = {
         'bitstamp': [
@@ -44,14 +46,20 @@ def prepare():
     dataset_path = os.path.join(DATASET_DIR, 'market')
     ensure_dataset(dataset_path, delete=True)
 
-    market_collection = mongodb()['market']
+    market_store = MarketStore()
+    market_collection = mongodb()['market'] if store == 'mongo' else None
     for timescale in TIMESCALES:
         for source, pairs in DATASETS.items():
             for pair in pairs:
                 logging.debug(f'Preprocessing {source}/{pair}/{timescale}')
-                collection = market_collection[source][pair][timescale].find()
-                df = pd.DataFrame(list(collection))
-                df = bitstamp_transform(df) if source == 'bitstamp' else binance_transform(df)
+                if store == 'parquet':
+                    # The market store keeps timestamps in seconds for every source
+                    df = market_store.read(source, pair, timescale, columns=VALID_COLUMNS)
+                    df = bitstamp_transform(df)
+                else:
+                    collection = market_collection[source][pair][timescale].find()
+                    df = pd.DataFrame(list(collection))
+                    df = bitstamp_transform(df) if source == 'bitstamp' else binance_transform(df)
                 # Convert fields to float
                 for c in VALID_COLUMNS:
                     if c != 'timestamp':
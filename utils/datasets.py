@@ -1,15 +1,25 @@
+import atexit
+import gc
+import hashlib
+import json
 import os
 import pickle
 import random
 import shutil
 import re
+import resource
 import sys
-from multiprocessing import Pool
+import time
+import types
+from multiprocessing import Pool, shared_memory
 
 import pandas as pd
 import numpy as np
 import psutil
-import torch
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.helpers import MappedVocabulary, load_helper_file, load_helper_vocabulary
 
 
 DATASET_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../data'))
@@ -32,30 +42,161 @@ def ensure_dataset(dir, delete=False):
     os.makedirs(dir, exist_ok=True)
 
 
-def batched_dataset(cursor, dir, dataset_size, batch_size, callback=None):
+def batch_table(batch, callback=None, columns=None) -> pa.Table:
+    df = pd.DataFrame(batch)
+    if columns:
+        df = df.reindex(columns=columns)
+    if callback:
+        df = callback(df)
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def batched_dataset(cursor, dir, dataset_size, batch_size, callback=None, drop_duplicates=False, columns=None):
+    """
+    Streams the cursor into `part_N.parquet` files of about `dataset_size` rows. Every cursor batch is written as a
+    row group, so memory is bounded by the batch size.
+    :param callback: applied to the DataFrame of every batch before it is written
+    :param drop_duplicates: skip documents marked as near-duplicates by `scraper dedup`
+    :param columns: columns to export, missing ones are stored as nulls. Project the query on the same fields to
+        avoid transferring the others.
+    :return: the written parts with their number of rows
+    """
     ensure_dataset(dir, delete=True)
-    i = 0
-    df = pd.DataFrame()
+    if drop_duplicates:
+        cursor = (doc for doc in cursor if doc.get('duplicate_of') is None)
+
+    i, rows, writer, parts = 0, 0, None, []
     for batch in batched(cursor, batch_size):
-        df = df.append(batch, ignore_index=True)
-        if len(df) >= dataset_size:
-            if callback:
-                df = callback(df)
-            df.to_parquet(os.path.join(dir, f'part_{i}.parquet'))
+        table = batch_table(batch, callback, columns)
+        if writer and not table.schema.equals(writer.schema):
+            # Fields which were added or changed type go into the next part
+            compatible = not set(table.schema.names) - set(writer.schema.names)
+            if compatible:
+                try:
+                    table = table.select(writer.schema.names).cast(writer.schema)
+                except (KeyError, pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+                    compatible = False
+            if not compatible:
+                writer.close()
+                writer, rows, i = None, 0, i + 1
+
+        if writer is None:
             print(f'Writing part {i}')
-            df = pd.DataFrame()
-            i += 1
-
-    if len(df) >= 0:
-        if callback:
-            df = callback(df)
-        df.to_parquet(os.path.join(dir, f'part_{i}.parquet'))
+            writer = pq.ParquetWriter(os.path.join(dir, f'part_{i}.parquet'), table.schema)
+            parts.append({'file': f'part_{i}.parquet', 'rows': 0})
+        writer.write_table(table)
+        rows += len(table)
+        parts[-1]['rows'] = rows
+
+        if rows >= dataset_size:
+            writer.close()
+            writer, rows, i = None, 0, i + 1
+
+    if writer:
+        writer.close()
+    if not parts:
+        # Empty cursor, still write an (empty) part so readers of the dataset find it
         print(f'Writing part {i}')
+        batch_table([], callback, columns).to_pandas().to_parquet(os.path.join(dir, f'part_{i}.parquet'))
+        parts.append({'file': f'part_{i}.parquet', 'rows': 0})
+    return parts
+
+
+def shard_bounds(collection, query, field, shards, sample_size=10000):
+    """
+    Splits the `field` range of the matching documents in `shards` ranges with about the same number of documents,
+    using the quantiles of a random sample.
+    """
+    sample = [doc[field] for doc in collection.aggregate([
+        {'$match': query},
+        {'$sample': {'size': sample_size}},
+        {'$project': {'_id': 0, field: 1}},
+    ]) if doc.get(field) is not None]
+    if not sample:
+        # Nothing to split on, export everything as a single shard
+        return [None, None]
+    sample = pd.Series(sample).sort_values(ignore_index=True)
+    bounds = [sample.iloc[int(len(sample) * k / shards)] for k in range(1, shards)]
+    # Duplicate bounds would create empty shards
+    return [None, *dict.fromkeys(bounds), None]
+
+
+def export_shard(args):
+    db_name, collection_name, query, projection, field, lo, hi, dir, dataset_size, batch_size, kwargs = args
+    from config import mongodb
+
+    # Every worker opens its own connection, clients can't be shared between processes
+    collection = mongodb()[db_name][collection_name]
+    bounds = {**({'$gte': lo} if lo is not None else {}), **({'$lt': hi} if hi is not None else {})}
+    if bounds and lo is None:
+        # Documents without (or with a null) field sort first and belong to the first shard
+        query = {'$and': [query, {'$or': [{field: bounds}, {field: None}]}]}
+    elif bounds:
+        query = {'$and': [query, {field: bounds}]}
+    cursor = collection.find(query, projection).sort(field, 1).batch_size(batch_size)
+
+    start = time.time()
+    parts = batched_dataset(cursor, dir, dataset_size, batch_size, **kwargs)
+    return {
+        'dir': os.path.basename(dir),
+        'from': str(lo) if lo is not None else None,
+        'until': str(hi) if hi is not None else None,
+        'rows': sum(part['rows'] for part in parts),
+        'seconds': round(time.time() - start, 2),
+        'parts': parts,
+    }
+
+
+def parallel_batched_dataset(collection, dir, dataset_size, batch_size, shards=None, query=None, projection=None,
+                             field='created_at', **kwargs):
+    """
+    Exports the collection like `batched_dataset`, but splits the (indexed) `field` range in `shards` ranges which
+    are read and written by parallel worker processes into `dir/shard_K/part_N.parquet`. Documents without `field`
+    are exported with the first shard.
+    A `manifest.json` listing the shards and their parts is written once all shards are done.
+    Extra arguments are passed to `batched_dataset`, a callback has to be picklable.
+    """
+    shards = shards or psutil.cpu_count()
+    query = query or {}
+    ensure_dataset(dir, delete=True)
+    bounds = shard_bounds(collection, query, field, shards)
+    jobs = [
+        (collection.database.name, collection.name, query, projection, field, lo, hi,
+         os.path.join(dir, f'shard_{k:03d}'), dataset_size, batch_size, kwargs)
+        for k, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:]))
+    ]
+
+    start = time.time()
+    with Pool(min(len(jobs), shards) or 1) as pool:
+        results = list(pool.imap(export_shard, jobs))
+    elapsed = time.time() - start
+
+    rows = sum(result['rows'] for result in results)
+    manifest = {
+        'collection': collection.full_name,
+        'field': field,
+        'rows': rows,
+        'seconds': round(elapsed, 2),
+        'shards': results,
+    }
+    with open(os.path.join(dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f'Exported {rows} rows in {len(results)} shards ({rows / max(elapsed, 1e-6):.0f} rows/s)')
+    return manifest
 
 
 # Simple "Memory profilers" to see memory usage
 def get_memory_usage():
-    return np.round(psutil.Process(os.getpid()).memory_info()[0] / 2. ** 30, 2)
+    return np.round(get_rss() / 2. ** 30, 2)
+
+
+def get_rss():
+    return psutil.Process(os.getpid()).memory_info()[0]
+
+
+def get_peak_rss():
+    # Peak resident set size of the process in bytes (ru_maxrss is in KiB on linux)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
 
 
 def sizeof_fmt(num, suffix='B'):
@@ -73,7 +214,9 @@ def seed_everything(seed=0):
     os.environ['PYTHONHASHSEED'] = str(seed)
     np.random.seed(seed)
 
+    # Only seed torch when it is used, importing it is slow
     if 'torch' in sys.modules:
+        torch = sys.modules['torch']
         torch.manual_seed(seed)
         torch.cuda.manual_seed(seed)
         torch.backends.cudnn.deterministic = True
@@ -107,25 +250,134 @@ def domain_search(text):
         return 'url'
 
 
+_pool = None
+
+
+def get_pool():
+    # The workers are kept alive between runs instead of forking a new pool every call
+    global _pool
+    if _pool is None:
+        _pool = Pool(psutil.cpu_count())
+    return _pool
+
+
+def close_pool():
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool.join()
+        _pool = None
+
+
+atexit.register(close_pool)
+
+
+def _write_table(shm, table):
+    # Separate function so every reference to the shared buffer is released before the block is closed
+    with pa.ipc.new_stream(pa.FixedSizeBufferWriter(pa.py_buffer(shm.buf)), table.schema) as writer:
+        writer.write_table(table)
+
+
+def write_shared(data):
+    """
+    Writes a DataFrame or Series as an arrow ipc stream into a new shared memory block.
+    :return: reference which can be passed to other processes to read the data back
+    """
+    series = isinstance(data, pd.Series)
+    # The index is stored as a column, a RangeIndex would only be kept as metadata and lost when the table is sliced
+    table = pa.Table.from_pandas(data.to_frame(name='series') if series else data, preserve_index=True)
+    sink = pa.MockOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, sink.size()))
+    _write_table(shm, table)
+    shm.close()
+    return shm.name, (data.name if series else None), series
+
+
+def read_shared(shm, ref, offset=0, length=None, copy=False):
+    """
+    Reads (a slice of) a DataFrame or Series from a shared memory block. Unless copied, arrow reads the buffers in
+    place and the result may still reference them, so the block can only be closed once the data isn't used anymore.
+    """
+    _, series_name, series = ref
+    buffer = pa.py_buffer(bytes(shm.buf) if copy else shm.buf)
+    table = pa.ipc.open_stream(buffer).read_all()
+    if length is not None:
+        table = table.slice(offset, length)
+    df = table.to_pandas()
+    return df['series'].rename(series_name) if series else df
+
+
+def release_shared(shm, unlink=False):
+    try:
+        shm.close()
+    except BufferError:
+        # Arrow / pandas objects in reference cycles may still hold the buffer
+        gc.collect()
+        shm.close()
+    if unlink:
+        shm.unlink()
+
+
+def code_fingerprint(code):
+    # Nested code objects (lambdas, comprehensions) are hashed by their content instead of their repr with an address
+    consts = tuple(code_fingerprint(c) if isinstance(c, types.CodeType) else c for c in code.co_consts)
+    return hashlib.sha1(repr((code.co_code, consts, code.co_names)).encode()).hexdigest()
+
+
+def func_fingerprint(func):
+    code = getattr(func, '__code__', None)
+    return code_fingerprint(code) if code is not None else None
+
+
+def _run_partition(args):
+    func, fingerprint, ref, offset, length = args
+    try:
+        func = pickle.loads(func)
+    except AttributeError:
+        # The function was defined after the workers were forked
+        return None
+    if func_fingerprint(func) != fingerprint:
+        # The function was redefined after the workers were forked, they would run the old body
+        return None
+    shm = shared_memory.SharedMemory(name=ref[0])
+    result = write_shared(func(read_shared(shm, ref, offset, length)))
+    release_shared(shm)
+    return result
+
+
 # Multiprocessing Run.
 # :df - DataFrame to split                      # type: pandas DataFrame
 # :func - Function to apply on each split       # type: python function
-# This function is NOT 'bulletproof', be carefull and pass only correct types of variables.
-def df_parallelize_run(df, func):
-    num_partitions, num_cores = 16, psutil.cpu_count()  # number of partitions and cores
-    df_split = np.array_split(df, num_partitions)
-    pool = Pool(num_cores)
-    df = pd.concat(pool.map(func, df_split))
-    pool.close()
-    pool.join()
-    return df
-
-
-## Load helper helper))
-def load_helper_file(filename):
-    with open(os.path.join(os.path.dirname(__file__), '../data/helpers', filename + '.pickle'), 'rb') as f:
-        temp_obj = pickle.load(f)
-    return temp_obj
+# The frame is shared with the workers once through shared memory (arrow ipc) and split in one partition per core.
+# Workers which resolve func to a different (or no) body than the caller's, e.g. after a cell was re-run, are restarted.
+# Columns have to be convertible to arrow, func has to return a DataFrame or Series.
+def df_parallelize_run(df, func, num_partitions=None):
+    num_partitions = num_partitions or psutil.cpu_count()
+    bounds = np.linspace(0, len(df), num_partitions + 1).astype(int)
+    ref = write_shared(df)
+    try:
+        func, fingerprint = pickle.dumps(func), func_fingerprint(func)
+        tasks = [(func, fingerprint, ref, lo, hi - lo) for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+        results = get_pool().map(_run_partition, tasks)
+        if any(result is None for result in results):
+            for result in results:
+                if result is not None:
+                    release_shared(shared_memory.SharedMemory(name=result[0]), unlink=True)
+            close_pool()
+            results = get_pool().map(_run_partition, tasks)
+    finally:
+        release_shared(shared_memory.SharedMemory(name=ref[0]), unlink=True)
+
+    # The results outlive the blocks, so they are copied out before the blocks are freed
+    parts = []
+    for result in results:
+        shm = shared_memory.SharedMemory(name=result[0])
+        parts.append(read_shared(shm, result, copy=True))
+        release_shared(shm, unlink=True)
+    return pd.concat(parts)
 
 
 ## Build of vocabulary from file - reading data line by line
@@ -143,7 +395,9 @@ def get_vocabulary(path):
 def check_vocab(c_list, vocabulary, response='default'):
     try:
         words = set([w for line in c_list for w in line.split()])
-        u_list = words.difference(set(vocabulary))
+        if not isinstance(vocabulary, (set, frozenset, MappedVocabulary)):
+            vocabulary = set(vocabulary)
+        u_list = {w for w in words if w not in vocabulary}
         k_list = words.difference(u_list)
 
         if response == 'default':
@@ -1,6 +1,11 @@
 import asyncio
+import importlib
+import logging
+import time
 from functools import wraps
 
+import click
+
 
 def coro(f):
     @wraps(f)
@@ -8,3 +13,27 @@ def coro(f):
         return asyncio.run(f(*args, **kwargs))
 
     return wrapper
+
+
+class LazyGroup(click.Group):
+    """
+    Click group which only imports the module of a subcommand once it is invoked.
+    Subcommands are given as `{name: 'package.module:command'}`.
+    """
+
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx):
+        return sorted([*super().list_commands(ctx), *self.lazy_commands])
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.lazy_commands:
+            return super().get_command(ctx, cmd_name)
+
+        module_name, attr = self.lazy_commands[cmd_name].split(':')
+        start = time.perf_counter()
+        command = getattr(importlib.import_module(module_name), attr)
+        logging.debug(f'Loaded command {cmd_name} in {time.perf_counter() - start:.3f}s')
+        return command
@@ -0,0 +1,116 @@
+import functools
+import hashlib
+import mmap
+import os
+import pickle
+
+import numpy as np
+
+HELPER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../data/helpers'))
+
+
+def helper_path(filename, extension='.pickle'):
+    return os.path.join(HELPER_DIR, filename + extension)
+
+
+def read_helper_file(filename):
+    with open(helper_path(filename), 'rb') as f:
+        return pickle.load(f)
+
+
+@functools.lru_cache(maxsize=None)
+def load_helper_file(filename):
+    """
+    Loads a pickled helper object. Objects are cached per process, so don't modify the returned object in place.
+    """
+    return read_helper_file(filename)
+
+
+@functools.lru_cache(maxsize=None)
+def helper_version(*filenames) -> str:
+    """
+    Content hash of the given pickled helpers, changes whenever one of them is updated.
+    """
+    digest = hashlib.sha1()
+    for filename in filenames:
+        with open(helper_path(filename), 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class MappedVocabulary:
+    """
+    Read only vocabulary stored as sorted utf-8 words (`<name>.words.bin`) with their uint64 offsets
+    (`<name>.offsets.bin`). Both files are memory mapped, so every process which loads the vocabulary shares the
+    same pages instead of holding its own copy of the word strings. Lookups are a binary search.
+    """
+
+    def __init__(self, words: mmap.mmap, offsets: memoryview):
+        self.words = words
+        self.offsets = offsets
+        self.size = len(offsets) - 1
+
+    @classmethod
+    def build(cls, vocabulary, path):
+        encoded = sorted({str(word).encode('utf-8') for word in vocabulary})
+        offsets = np.zeros(len(encoded) + 1, dtype='<u8')
+        offsets[1:] = np.cumsum([len(word) for word in encoded])
+        with open(path + '.words.bin', 'wb') as f:
+            f.write(b''.join(encoded))
+        with open(path + '.offsets.bin', 'wb') as f:
+            f.write(offsets.tobytes())
+
+    @classmethod
+    def open(cls, path):
+        return cls(map_file(path + '.words.bin'), memoryview(map_file(path + '.offsets.bin')).cast('Q'))
+
+    def _word(self, i) -> bytes:
+        return self.words[self.offsets[i]:self.offsets[i + 1]]
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError(i)
+        return self._word(i).decode('utf-8')
+
+    def __iter__(self):
+        for i in range(self.size):
+            yield self._word(i).decode('utf-8')
+
+    def __contains__(self, word):
+        key = word.encode('utf-8')
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._word(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo < self.size and self._word(lo) == key
+
+
+def map_file(path):
+    with open(path, 'rb') as f:
+        # Empty files can't be mapped
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b''
+
+
+@functools.lru_cache(maxsize=None)
+def load_helper_vocabulary(filename) -> MappedVocabulary:
+    """
+    Loads a pickled word list as a `MappedVocabulary`. The compact format is built next to the pickle on first use
+    and rebuilt when the pickle changes.
+    """
+    source, path = helper_path(filename), helper_path(filename, '')
+    if not os.path.exists(path + '.offsets.bin') or os.path.getmtime(path + '.offsets.bin') < os.path.getmtime(source):
+        # Written to a temporary name first, so parallel workers never map a half written vocabulary
+        tmp = f'{path}.{os.getpid()}.tmp'
+        MappedVocabulary.build(read_helper_file(filename), tmp)
+        os.replace(tmp + '.words.bin', path + '.words.bin')
+        os.replace(tmp + '.offsets.bin', path + '.offsets.bin')
+    return MappedVocabulary.open(path)
@@ -0,0 +1,109 @@
+import glob
+import os
+import time
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+MARKET_STORE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../data/market_store'))
+
+# Timestamp units per second of the sources which don't store seconds
+TIMESTAMP_UNITS = {
+    'binance': 1000,
+}
+DROP_COLUMNS = ['_id', 'ignore']
+
+
+def normalize_candles(source, records) -> pd.DataFrame:
+    """
+    Converts raw candles of a source into a frame with an int64 `timestamp` in seconds and float64 values.
+    """
+    df = records if isinstance(records, pd.DataFrame) else pd.DataFrame(records)
+    df = df.drop(columns=[c for c in DROP_COLUMNS if c in df.columns])
+    df['timestamp'] = df['timestamp'].astype('int64') // TIMESTAMP_UNITS.get(source, 1)
+    for c in df.columns:
+        if c != 'timestamp':
+            df[c] = pd.to_numeric(df[c], errors='coerce').astype('float64')
+    return df
+
+
+class MarketStore:
+    """
+    Parquet candle store partitioned as `source=<source>/pair=<pair>/step=<step>/month=<YYYY-MM>`.
+    Every append writes a new file per touched month; overlapping candles are deduplicated on read (last write wins)
+    and by `compact`.
+    """
+
+    def __init__(self, root=MARKET_STORE_DIR):
+        self.root = root
+
+    def path(self, source, pair, step):
+        return os.path.join(self.root, f'source={source}', f'pair={pair}', f'step={step}')
+
+    @staticmethod
+    def part_name():
+        # Parts sort in write order, which is used to let the latest write win
+        return f'part-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet'
+
+    def exists(self, source, pair, step):
+        return os.path.isdir(self.path(source, pair, step))
+
+    def append(self, source, pair, step, records):
+        df = normalize_candles(source, records)
+        if len(df) == 0:
+            return 0
+
+        months = pd.to_datetime(df['timestamp'], unit='s').dt.strftime('%Y-%m')
+        for month, part in df.groupby(months):
+            folder = os.path.join(self.path(source, pair, step), f'month={month}')
+            os.makedirs(folder, exist_ok=True)
+            table = pa.Table.from_pandas(part.sort_values('timestamp'), preserve_index=False)
+            pq.write_table(table, os.path.join(folder, self.part_name()))
+        return len(df)
+
+    def read(self, source, pair, step, start=None, end=None, columns=None) -> pd.DataFrame:
+        """
+        Reads candles with `start <= timestamp < end` (unix seconds). Month partitions outside the range are pruned
+        and the timestamp predicate is pushed down to the row groups.
+        """
+        if not self.exists(source, pair, step):
+            return pd.DataFrame(columns=columns or ['timestamp'])
+
+        root = self.path(source, pair, step)
+        files = sorted(glob.glob(os.path.join(root, 'month=*', '*.parquet')))
+        dataset = ds.dataset(files, format='parquet', partitioning='hive', partition_base_dir=root)
+        predicate = None
+        for op, value in [('ge', start), ('lt', end)]:
+            if value is None:
+                continue
+            month = pd.Timestamp(value, unit='s').strftime('%Y-%m')
+            field_filter = (ds.field('month') >= month) & (ds.field('timestamp') >= value) if op == 'ge' \
+                else (ds.field('month') <= month) & (ds.field('timestamp') < value)
+            predicate = field_filter if predicate is None else predicate & field_filter
+
+        if columns and 'timestamp' not in columns:
+            columns = ['timestamp', *columns]
+        table = dataset.to_table(filter=predicate, columns=columns)
+        df = table.to_pandas().drop(columns=['month'], errors='ignore')
+        return df.drop_duplicates('timestamp', keep='last').sort_values('timestamp').reset_index(drop=True)
+
+    def compact(self, source, pair, step):
+        """
+        Rewrites every month partition into a single deduplicated file.
+        """
+        root = self.path(source, pair, step)
+        if not os.path.isdir(root):
+            return
+        for folder in sorted(os.listdir(root)):
+            files = sorted(os.path.join(root, folder, f) for f in os.listdir(os.path.join(root, folder)))
+            if len(files) <= 1:
+                continue
+            df = pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+            df = df.drop_duplicates('timestamp', keep='last').sort_values('timestamp')
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False),
+                           os.path.join(root, folder, self.part_name()))
+            for f in files:
+                os.remove(f)
@@ -0,0 +1,84 @@
+import logging
+import threading
+import time
+
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
+
+
+class BulkWriter:
+    """
+    Buffers documents and upserts them by `_id` in unordered bulk batches.
+    A batch is flushed once it reaches `batch_size` documents or when `flush_interval` seconds have passed since
+    the last flush. Use as a context manager to flush the remainder on exit.
+    A batch which fails as a whole (e.g. the connection dropped) is put back into the buffer before the error is
+    raised, so the next flush retries it.
+    """
+
+    def __init__(self, collection, batch_size=1000, flush_interval=5.0):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()
+        # Held across the write, so a flush only returns once every document buffered before it is written
+        self.flush_lock = threading.Lock()
+
+        self.inserted = 0
+        self.matched = 0
+        self.modified = 0
+        self.errors = 0
+        self.failures = 0
+
+    def add(self, doc):
+        self.extend([doc])
+
+    def extend(self, docs):
+        with self.lock:
+            self.buffer.extend(docs)
+            should_flush = len(self.buffer) >= self.batch_size \
+                or time.monotonic() - self.last_flush >= self.flush_interval
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        with self.flush_lock:
+            self._flush()
+
+    def _flush(self):
+        with self.lock:
+            batch, self.buffer = self.buffer, []
+            self.last_flush = time.monotonic()
+        if not batch:
+            return
+
+        try:
+            result = self.collection.bulk_write(
+                [ReplaceOne({'_id': doc['_id']}, doc, upsert=True) for doc in batch],
+                ordered=False
+            ).bulk_api_result
+        except BulkWriteError as e:
+            result = e.details
+            logging.warning(f'Bulk write to {self.collection.full_name} had {len(result["writeErrors"])} errors')
+        except Exception:
+            with self.lock:
+                self.buffer[:0] = batch
+                self.failures += 1
+            raise
+
+        with self.lock:
+            self.inserted += result.get('nUpserted', 0) + result.get('nInserted', 0)
+            self.matched += result.get('nMatched', 0)
+            self.modified += result.get('nModified', 0)
+            self.errors += len(result.get('writeErrors', []))
+
+    def stats(self):
+        return {'inserted': self.inserted, 'matched': self.matched, 'modified': self.modified, 'errors': self.errors,
+                'failures': self.failures}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.flush()